@@ -0,0 +1,73 @@
+from typing import List, Optional
+from bson import ObjectId
+from pymongo import ASCENDING
+from ..utils.db import get_async_db
+from .catalog_versions import catalog_versions_repo, ALBUMS
+
+def album_filter(album_id: str) -> dict:
+    """Match an album by the id clients use for it.
+
+    Albums created through the API carry a string `id`; seeded ones only have
+    `_id`, and clients (and videos' album_id) then use str(_id).
+    """
+    if ObjectId.is_valid(album_id):
+        return {"$or": [{"id": album_id}, {"_id": ObjectId(album_id)}]}
+    return {"id": album_id}
+
+def public_album_id(album: dict) -> str:
+    return album.get("id") or str(album["_id"])
+
+class AlbumRepository:
+    """Async access to the albums collection"""
+
+    @property
+    def collection(self):
+        return get_async_db().albums
+
+    async def find_by_id(self, album_id: str) -> Optional[dict]:
+        return await self.collection.find_one(album_filter(album_id))
+
+    async def find_by_ids(self, album_ids: List[str]) -> List[dict]:
+        """_id and id of the albums matching any of the given ids (either form)"""
+        object_ids = [ObjectId(album_id) for album_id in album_ids if ObjectId.is_valid(album_id)]
+        query = {"$or": [{"id": {"$in": list(album_ids)}}, {"_id": {"$in": object_ids}}]}
+        return await self.collection.find(query, {"id": 1}).to_list(length=None)
+
+    async def list_active(self, limit: int = None, after: ObjectId = None) -> List[dict]:
+        """Active albums in _id order, starting after the given _id"""
+        query = {"is_active": True}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        cursor = self.collection.find(query).sort("_id", ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def list_ids(self, limit: int, after: ObjectId = None) -> List[dict]:
+        """_id and id of all albums in _id order, for batch jobs"""
+        query = {"_id": {"$gt": after}} if after is not None else {}
+        cursor = self.collection.find(query, {"id": 1}).sort("_id", ASCENDING).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def insert(self, album: dict):
+        result = await self.collection.insert_one(album)
+        await catalog_versions_repo.bump(ALBUMS)
+        return result.inserted_id
+
+    async def apply_stats_update(self, album_id: str, pipeline: list, session=None):
+        """Run an update pipeline against an album's stats fields.
+
+        Inside a transaction (session given) the caller bumps the catalog
+        version once the transaction commits.
+        """
+        result = await self.collection.update_one(album_filter(album_id), pipeline, session=session)
+        if session is None:
+            await catalog_versions_repo.bump(ALBUMS)
+        return result
+
+    async def bulk_write(self, operations: list):
+        result = await self.collection.bulk_write(operations, ordered=False)
+        await catalog_versions_repo.bump(ALBUMS)
+        return result
+
+albums_repo = AlbumRepository()
@@ -0,0 +1,68 @@
+import os
+from typing import Dict, List
+from pymongo import UpdateOne
+from ..utils.db import get_async_db
+from ..utils.cache import TTLCache
+
+# Versions read from Mongo are reused for this long. A bump made by this
+# process is seen at once; one made by another process (an upload worker, the
+# sync script) within this many seconds.
+CATALOG_VERSION_TTL_SECONDS = float(os.getenv("CATALOG_VERSION_TTL_SECONDS", "2"))
+
+# Version keys. ALBUMS covers the album listing; VIDEOS covers changes to
+# videos whose album is not known (bulk metadata syncs, share-token rotation).
+ALBUMS = "albums"
+VIDEOS = "videos"
+
+def album_key(album_id: str) -> str:
+    return f"album:{album_id}"
+
+class CatalogVersionRepository:
+    """Change counters for cached catalog reads (the catalog_versions collection).
+
+    Repositories bump a key after every write to the data it covers; readers
+    build ETags from the current versions.
+    """
+
+    def __init__(self):
+        self._cache = TTLCache(10000, CATALOG_VERSION_TTL_SECONDS)
+
+    @property
+    def collection(self):
+        return get_async_db().catalog_versions
+
+    async def get_many(self, keys: List[str]) -> Dict[str, int]:
+        versions = {}
+        missing = []
+        for key in keys:
+            version = self._cache.get(key)
+            if version is None:
+                missing.append(key)
+            else:
+                versions[key] = version
+        if missing:
+            found = {
+                doc["_id"]: doc["version"]
+                async for doc in self.collection.find({"_id": {"$in": missing}})
+            }
+            for key in missing:
+                versions[key] = found.get(key, 0)
+                self._cache.set(key, versions[key])
+        return versions
+
+    async def get(self, key: str) -> int:
+        return (await self.get_many([key]))[key]
+
+    async def bump(self, *keys: str):
+        """Record a change; call after the write it describes has completed"""
+        for key in keys:
+            self._cache.pop(key)
+        if len(keys) == 1:
+            await self.collection.update_one({"_id": keys[0]}, {"$inc": {"version": 1}}, upsert=True)
+        elif keys:
+            await self.collection.bulk_write(
+                [UpdateOne({"_id": key}, {"$inc": {"version": 1}}, upsert=True) for key in keys],
+                ordered=False
+            )
+
+catalog_versions_repo = CatalogVersionRepository()
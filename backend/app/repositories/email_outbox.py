@@ -0,0 +1,93 @@
+from typing import List
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+from ..utils.db import get_async_db
+
+class EmailOutboxRepository:
+    """Async access to the email_outbox collection"""
+
+    @property
+    def collection(self):
+        return get_async_db().email_outbox
+
+    async def enqueue(self, messages: List[dict]) -> list:
+        """Queue messages (to, subject, body) for the email worker"""
+        if not messages:
+            return []
+        now = datetime.utcnow()
+        documents = [
+            dict(
+                message,
+                status="pending",
+                attempts=0,
+                next_attempt_at=now,
+                created_at=now,
+                updated_at=now
+            )
+            for message in messages
+        ]
+        result = await self.collection.insert_many(documents, ordered=False)
+        return result.inserted_ids
+
+    async def claim_batch(self, worker: str, limit: int) -> List[dict]:
+        """Move up to `limit` due messages to sending and return them.
+
+        Only documents still pending are claimed, so two workers picking the
+        same ids never both send a message.
+        """
+        now = datetime.utcnow()
+        due = await self.collection.find(
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"_id": 1}
+        ).sort("next_attempt_at", ASCENDING).limit(limit).to_list(length=limit)
+        if not due:
+            return []
+        await self.collection.update_many(
+            {"_id": {"$in": [message["_id"] for message in due]}, "status": "pending"},
+            {"$set": {"status": "sending", "worker": worker, "locked_at": now, "updated_at": now}}
+        )
+        return await self.collection.find(
+            {"status": "sending", "worker": worker}
+        ).to_list(length=limit)
+
+    async def mark_sent(self, message_id):
+        now = datetime.utcnow()
+        return await self.collection.update_one(
+            {"_id": message_id},
+            {"$set": {"status": "sent", "sent_at": now, "updated_at": now, "error": None},
+             "$inc": {"attempts": 1}}
+        )
+
+    async def mark_failed(self, message_id, error: str, retry_at=None):
+        """Schedule another attempt at retry_at, or give up when it is None"""
+        fields = {"error": error, "updated_at": datetime.utcnow()}
+        if retry_at is None:
+            fields["status"] = "failed"
+        else:
+            fields.update(status="pending", next_attempt_at=retry_at)
+        return await self.collection.update_one(
+            {"_id": message_id},
+            {"$set": fields, "$inc": {"attempts": 1}}
+        )
+
+    async def release(self, worker: str) -> int:
+        """Put this worker's unsent claims back in the queue"""
+        result = await self.collection.update_many(
+            {"status": "sending", "worker": worker},
+            {"$set": {"status": "pending", "updated_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    async def requeue_stale(self, stale_seconds: float) -> int:
+        """Put back claims whose lease expired: the worker crashed, hung or died"""
+        result = await self.collection.update_many(
+            {
+                "status": "sending",
+                # Also matches claims made before locked_at was recorded
+                "locked_at": {"$not": {"$gte": datetime.utcnow() - timedelta(seconds=stale_seconds)}}
+            },
+            {"$set": {"status": "pending", "updated_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+
+email_outbox_repo = EmailOutboxRepository()
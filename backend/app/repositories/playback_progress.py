@@ -0,0 +1,48 @@
+from typing import List
+from pymongo import UpdateOne
+from ..utils.db import get_async_db
+
+def progress_id(user_id: str, video_id: str) -> str:
+    return f"{user_id}:{video_id}"
+
+def progress_operation(entry: dict) -> UpdateOne:
+    """Upsert of one user's position in one video.
+
+    An update pipeline that only applies the entry if it was reported after
+    the stored one, so a late flush from another worker cannot move a
+    viewer back to an older position.
+    """
+    # A missing reported_at (new document) compares lower than any date
+    is_newer = {"$gt": [entry["reported_at"], "$reported_at"]}
+    fields = {
+        key: {"$cond": [is_newer, {"$literal": entry[key]}, f"${key}"]}
+        for key in ("album_id", "position", "duration", "completed", "reported_at")
+    }
+    fields.update(user_id=entry["user_id"], video_id=entry["video_id"])
+    return UpdateOne(
+        {"_id": progress_id(entry["user_id"], entry["video_id"])},
+        [{"$set": fields}],
+        upsert=True
+    )
+
+class PlaybackProgressRepository:
+    """Async access to the playback_progress collection"""
+
+    @property
+    def collection(self):
+        return get_async_db().playback_progress
+
+    async def save_many(self, entries: List[dict]):
+        """Write buffered positions with one unordered bulk_write"""
+        return await self.collection.bulk_write(
+            [progress_operation(entry) for entry in entries],
+            ordered=False
+        )
+
+    async def list_for_album(self, user_id: str, album_id: str) -> List[dict]:
+        return await self.collection.find(
+            {"user_id": user_id, "album_id": album_id},
+            {"_id": 0, "user_id": 0}
+        ).to_list(length=None)
+
+playback_progress_repo = PlaybackProgressRepository()
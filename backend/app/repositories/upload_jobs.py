@@ -0,0 +1,104 @@
+from typing import List, Optional
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, ReturnDocument
+from ..utils.db import get_async_db
+
+class UploadJobRepository:
+    """Async access to the upload_jobs collection"""
+
+    @property
+    def collection(self):
+        return get_async_db().upload_jobs
+
+    async def find_by_id(self, job_id: str) -> Optional[dict]:
+        if not ObjectId.is_valid(job_id):
+            return None
+        return await self.collection.find_one({"_id": ObjectId(job_id)})
+
+    async def insert(self, job: dict):
+        result = await self.collection.insert_one(job)
+        return result.inserted_id
+
+    async def update_fields(self, job_id, fields: dict):
+        fields = dict(fields, updated_at=datetime.utcnow())
+        return await self.collection.update_one({"_id": ObjectId(job_id)}, {"$set": fields})
+
+    async def count_queued(self, host: str) -> int:
+        return await self.collection.count_documents({"status": "queued", "host": host})
+
+    async def claim_next(self, host: str, worker: str) -> Optional[dict]:
+        """Atomically move the oldest due queued job staged on this host to uploading"""
+        return await self.collection.find_one_and_update(
+            {"status": "queued", "host": host, "retry_after": {"$not": {"$gt": datetime.utcnow()}}},
+            {
+                "$set": {
+                    "status": "uploading",
+                    "worker": worker,
+                    "started_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def requeue_stale(self, stale_seconds: float, max_attempts: int, retry_base_seconds: float) -> int:
+        """Put back jobs whose worker stopped reporting progress (e.g. crashed), on any host.
+
+        Like a failed attempt, a requeued job waits retry_base_seconds * 2^(attempts - 1)
+        before it can be claimed again; see fail_stale() for jobs out of attempts.
+        """
+        now = datetime.utcnow()
+        delay_ms = {"$multiply": [retry_base_seconds * 1000, {"$pow": [2, {"$subtract": ["$attempts", 1]}]}]}
+        result = await self.collection.update_many(
+            {
+                "status": "uploading",
+                "attempts": {"$lt": max_attempts},
+                "updated_at": {"$lt": now - timedelta(seconds=stale_seconds)}
+            },
+            [{"$set": {"status": "queued", "retry_after": {"$add": [now, delay_ms]}, "updated_at": now}}]
+        )
+        return result.modified_count
+
+    async def fail_stale(self, stale_seconds: float, max_attempts: int) -> List[dict]:
+        """Fail stale jobs that have used all their attempts; returns them"""
+        query = {
+            "status": "uploading",
+            "attempts": {"$gte": max_attempts},
+            "updated_at": {"$lt": datetime.utcnow() - timedelta(seconds=stale_seconds)}
+        }
+        jobs = await self.collection.find(query, {"host": 1, "staged_path": 1}).to_list(length=None)
+        if jobs:
+            await self.collection.update_many(
+                dict(query, _id={"$in": [job["_id"] for job in jobs]}),
+                {"$set": {
+                    "status": "failed",
+                    "error": f"Abandoned by its worker after {max_attempts} attempts",
+                    "updated_at": datetime.utcnow()
+                }}
+            )
+        return jobs
+
+    async def list_queued_elsewhere(self, host: str, stale_seconds: float) -> List[dict]:
+        """Queued jobs of other hosts that nobody has touched for stale_seconds"""
+        return await self.collection.find(
+            {
+                "status": "queued",
+                "host": {"$ne": host},
+                "updated_at": {"$lt": datetime.utcnow() - timedelta(seconds=stale_seconds)}
+            },
+            {"host": 1, "staged_path": 1, "bunny": 1}
+        ).to_list(length=None)
+
+    async def update_queued(self, job_id, from_host: str, fields: dict) -> bool:
+        """Update a job only if it is still queued on from_host"""
+        fields = dict(fields, updated_at=datetime.utcnow())
+        result = await self.collection.update_one(
+            {"_id": ObjectId(job_id), "status": "queued", "host": from_host},
+            {"$set": fields}
+        )
+        return result.modified_count == 1
+
+upload_jobs_repo = UploadJobRepository()
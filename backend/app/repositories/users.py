@@ -0,0 +1,138 @@
+import asyncio
+from typing import List, Optional
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING
+import re
+from ..utils.db import get_async_db
+
+# Filters behind the admin dashboard's user lists
+USER_BUCKETS = {
+    "pending": {"is_approved": False, "is_admin": False},
+    "approved": {"is_approved": True, "is_admin": {"$ne": True}},
+    "admins": {"is_admin": True},
+}
+
+# Fields returned by the admin user listings
+LIST_PROJECTION = {
+    "email": 1,
+    "phone_number": 1,
+    "created_at": 1,
+    "is_admin": 1,
+    "is_approved": 1
+}
+
+class UserRepository:
+    """Async access to the users collection"""
+
+    @property
+    def collection(self):
+        return get_async_db().users
+
+    async def find_by_id(self, user_id: str, projection: dict = None) -> Optional[dict]:
+        return await self.collection.find_one({"_id": ObjectId(user_id)}, projection)
+
+    async def find_by_email(self, email: str, projection: dict = None) -> Optional[dict]:
+        return await self.collection.find_one({"email": email}, projection)
+
+    async def find_many(self, query: dict, projection: dict = None) -> List[dict]:
+        return await self.collection.find(query, projection).to_list(length=None)
+
+    async def insert(self, user: dict) -> ObjectId:
+        result = await self.collection.insert_one(user)
+        return result.inserted_id
+
+    async def update_fields(self, user_id: str, fields: dict):
+        return await self.collection.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$set": fields}
+        )
+
+    async def update_roles(self, user_id: str, fields: dict, expected: dict):
+        """Set role fields and bump token_version so issued tokens go stale.
+
+        Only applies while the user still matches `expected` (the state the
+        change starts from), so modified_count is 0 when there was nothing to
+        change rather than always 1 because of the version bump.
+        """
+        return await self.collection.update_one(
+            dict(expected, _id=ObjectId(user_id)),
+            {"$set": fields, "$inc": {"token_version": 1}}
+        )
+
+    async def approve_pending(self, query: dict) -> tuple:
+        """Approve every pending user matching query with one update_many.
+
+        Returns (modified_count, approved users' _id and email). The users are
+        tagged with a batch id so exactly the ones this call modified are read back.
+        """
+        batch = ObjectId()
+        result = await self.collection.update_many(
+            dict(query, **USER_BUCKETS["pending"]),
+            {
+                "$set": {"is_approved": True, "approval_batch": batch, "updated_at": datetime.utcnow()},
+                "$inc": {"token_version": 1}
+            }
+        )
+        approved = []
+        if result.modified_count:
+            approved = await self.collection.find({"approval_batch": batch}, {"email": 1}).to_list(length=None)
+        return result.modified_count, approved
+
+    async def delete_pending(self, query: dict) -> tuple:
+        """Delete pending users matching query; returns (deleted_count, their _ids)"""
+        query = dict(query, **USER_BUCKETS["pending"])
+        users = await self.collection.find(query, {"_id": 1}).to_list(length=None)
+        if not users:
+            return 0, []
+        ids = [user["_id"] for user in users]
+        result = await self.collection.delete_many(dict(query, _id={"$in": ids}))
+        return result.deleted_count, ids
+
+    async def count(self, query: dict) -> int:
+        return await self.collection.count_documents(query)
+
+    async def bucket_overview(self, limit: int) -> dict:
+        """Count and first page (by email) of every bucket.
+
+        One count and one find per bucket, run concurrently, so each is
+        bounded by its bucket's index instead of reading the whole collection.
+        Pages hold limit + 1 users so callers can tell whether more follow.
+        """
+        buckets = list(USER_BUCKETS)
+        results = await asyncio.gather(*(
+            operation
+            for bucket in buckets
+            for operation in (
+                self.count(USER_BUCKETS[bucket]),
+                self.list_bucket(bucket, limit=limit + 1)
+            )
+        ))
+        return {
+            bucket: {"count": results[2 * position], "users": results[2 * position + 1]}
+            for position, bucket in enumerate(buckets)
+        }
+
+    async def list_bucket(
+        self,
+        bucket: str,
+        email_prefix: str = None,
+        limit: int = None,
+        after_email: str = None
+    ) -> List[dict]:
+        """Users of a bucket in email order, optionally filtered by email prefix"""
+        query = dict(USER_BUCKETS[bucket])
+        email_query = {}
+        if email_prefix:
+            # Anchored, escaped regex so the email index bounds the scan
+            email_query["$regex"] = "^" + re.escape(email_prefix)
+        if after_email is not None:
+            email_query["$gt"] = after_email
+        if email_query:
+            query["email"] = email_query
+        cursor = self.collection.find(query, LIST_PROJECTION).sort("email", ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit)
+
+users_repo = UserRepository()
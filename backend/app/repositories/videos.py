@@ -0,0 +1,134 @@
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+from ..utils.db import get_async_db
+from ..utils.cache import TTLCache
+from .catalog_versions import catalog_versions_repo, album_key, VIDEOS
+
+# Share-token lookups. Rotation drops the old token at once in this process;
+# other processes keep serving it for at most SHARE_CACHE_TTL_SECONDS.
+SHARE_CACHE_TTL_SECONDS = float(os.getenv("SHARE_CACHE_TTL_SECONDS", "60"))
+SHARE_CACHE_MAX_SIZE = int(os.getenv("SHARE_CACHE_MAX_SIZE", "10000"))
+# Unknown tokens are remembered briefly so guessing costs no query. They are
+# kept apart from found videos so a flood of guesses cannot evict real links.
+SHARE_NEGATIVE_TTL_SECONDS = float(os.getenv("SHARE_NEGATIVE_TTL_SECONDS", "10"))
+SHARE_NEGATIVE_MAX_SIZE = int(os.getenv("SHARE_NEGATIVE_MAX_SIZE", "2000"))
+
+# Fields returned by video listings such as search results
+LIST_PROJECTION = {
+    "id": 1,
+    "title": 1,
+    "description": 1,
+    "thumbnail_url": 1,
+    "album_id": 1,
+    "duration": 1,
+    "created_at": 1
+}
+
+class VideoRepository:
+    """Async access to the videos collection"""
+
+    def __init__(self):
+        self._share_cache = TTLCache(SHARE_CACHE_MAX_SIZE, SHARE_CACHE_TTL_SECONDS)
+        self._share_misses = TTLCache(SHARE_NEGATIVE_MAX_SIZE, SHARE_NEGATIVE_TTL_SECONDS)
+
+    @property
+    def collection(self):
+        return get_async_db().videos
+
+    async def find_by_id(self, video_id: str) -> Optional[dict]:
+        return await self.collection.find_one({"id": video_id})
+
+    async def find_by_ids(self, video_ids: List[str], projection: dict = None) -> List[dict]:
+        return await self.collection.find({"id": {"$in": video_ids}}, projection).to_list(length=None)
+
+    def _forget_share_token(self, share_token: str):
+        self._share_cache.pop(share_token)
+        self._share_misses.pop(share_token)
+
+    async def find_by_share_token(self, share_token: str) -> Optional[dict]:
+        video = self._share_cache.get(share_token)
+        if video is None:
+            if share_token in self._share_misses:
+                return None
+            video = await self.collection.find_one({"share_token": share_token})
+            if video is None:
+                self._share_misses.set(share_token, True)
+                return None
+            self._share_cache.set(share_token, video)
+        # Callers convert fields in place; keep the cached document intact
+        return dict(video)
+
+    async def list_by_album(self, album_id: str, limit: int = None, after: ObjectId = None) -> List[dict]:
+        """Videos of an album in _id order, starting after the given _id"""
+        query = {"album_id": album_id}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        cursor = self.collection.find(query).sort("_id", ASCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def search(self, text: str, limit: int, skip: int = 0) -> List[dict]:
+        """Videos matching a text query, most relevant first"""
+        projection = dict(LIST_PROJECTION, score={"$meta": "textScore"})
+        cursor = self.collection.find({"$text": {"$search": text}}, projection)
+        cursor = cursor.sort([("score", {"$meta": "textScore"})]).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def insert(self, video: dict, session=None):
+        result = await self.collection.insert_one(video, session=session)
+        if video.get("share_token"):
+            # The token may have been cached as unknown before the video existed
+            self._forget_share_token(video["share_token"])
+        if video.get("album_id") and session is None:
+            # Inside a transaction the caller bumps once it commits
+            await catalog_versions_repo.bump(album_key(video["album_id"]))
+        return result.inserted_id
+
+    async def insert_many(self, videos: List[dict], session=None) -> Dict[int, str]:
+        """Insert videos unordered; returns error messages by index of those that failed.
+
+        Inside a transaction any failure aborts it, so errors are raised instead.
+        """
+        failed = {}
+        try:
+            await self.collection.insert_many(videos, ordered=False, session=session)
+        except BulkWriteError as e:
+            if session is not None:
+                raise
+            failed = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+        inserted = [video for index, video in enumerate(videos) if index not in failed]
+        for video in inserted:
+            if video.get("share_token"):
+                self._forget_share_token(video["share_token"])
+        album_ids = {video["album_id"] for video in inserted if video.get("album_id")}
+        if album_ids and session is None:
+            await catalog_versions_repo.bump(*(album_key(album_id) for album_id in album_ids))
+        return failed
+
+    async def bulk_write(self, operations: list):
+        result = await self.collection.bulk_write(operations, ordered=False)
+        self._share_cache.clear()
+        self._share_misses.clear()
+        await catalog_versions_repo.bump(VIDEOS)
+        return result
+
+    async def set_share_token(self, video_id: str, share_token: str) -> Optional[dict]:
+        """Replace a video's share token; returns the document as it was before"""
+        previous = await self.collection.find_one_and_update(
+            {"id": video_id},
+            {"$set": {"share_token": share_token, "updated_at": datetime.utcnow()}},
+            projection={"share_token": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous and previous.get("share_token"):
+            self._forget_share_token(previous["share_token"])
+        self._forget_share_token(share_token)
+        await catalog_versions_repo.bump(VIDEOS)
+        return previous
+
+videos_repo = VideoRepository()
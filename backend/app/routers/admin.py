@@ -1,11 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from bson import ObjectId
-from ..utils.db import get_db
-from ..utils.auth import get_current_user
-from pymongo import MongoClient
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Response
+from ..utils.auth import get_current_user, invalidate_user, invalidate_users
+from ..repositories.users import users_repo, USER_BUCKETS
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, paginate
 from ..models.user import User
-from ..utils.email import send_approval_email
+from ..utils.email import send_approval_email, send_approval_emails
+from ..services.bunny_service import bunny_service
+from ..services.bunny_sync import bunny_sync
+from ..services.email_outbox import email_worker
+from ..services.catalog_export import export_ndjson, gzip_chunks, EXPORT_COLLECTIONS
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+from typing import List, Optional
+from bson import ObjectId
+from pydantic import BaseModel, Field
 
 router = APIRouter()
 
@@ -17,16 +24,66 @@ async def get_current_admin_user(current_user: dict = Depends(get_current_user))
         )
     return current_user
 
+def serialize_user(user: dict) -> dict:
+    return {
+        "id": str(user["_id"]),
+        "email": user["email"],
+        "phone_number": user.get("phone_number"),
+        "created_at": user.get("created_at"),
+        "is_admin": user.get("is_admin", False),
+        "is_approved": user.get("is_approved", False)
+    }
+
+@router.get("/users/overview")
+async def get_users_overview(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Counts and first page of the pending, approved and admin buckets.
+
+    Each bucket carries the cursor of its next page in next_cursor, to be
+    passed as `after` to GET /users?bucket=...
+    """
+    overview = await users_repo.bucket_overview(limit)
+    result = {}
+    for bucket, data in overview.items():
+        users = data["users"][:limit]
+        more = len(data["users"]) > limit
+        result[bucket] = {
+            "count": data["count"],
+            "users": [serialize_user(user) for user in users],
+            "next_cursor": encode_cursor(users[-1]["email"]) if more else None
+        }
+    return result
+
+@router.get("/users")
+async def list_users(
+    response: Response,
+    bucket: str = Query(..., regex="^(" + "|".join(USER_BUCKETS) + ")$"),
+    q: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Users of a bucket by email, filtered by email prefix q; next page cursor in X-Next-Cursor"""
+    users = await users_repo.list_bucket(
+        bucket,
+        email_prefix=q,
+        limit=limit + 1,
+        after_email=decode_cursor(after, str)
+    )
+    users = paginate(response, users, limit, key="email")
+    return [serialize_user(user) for user in users]
+
 @router.get("/users/pending")
 async def get_pending_users(current_user: dict = Depends(get_current_admin_user)):
-    db = get_db()
     # Add logging
     print("Current admin user:", current_user)
     
     query = {"is_approved": False, "is_admin": False}
     print("Query:", query)
     
-    users = list(db.users.find(query, {"hashed_password": 0}))
+    users = await users_repo.find_many(query, {"hashed_password": 0})
     print("Found users:", users)
     
     result = [
@@ -45,25 +102,76 @@ async def approve_user(
     user_id: str,
     current_user = Depends(get_current_admin_user)
 ):
-    db = get_db()
-    result = db.users.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$set": {"is_approved": True}}
-    )
+    result = await users_repo.update_roles(user_id, {"is_approved": True}, expected={"is_approved": False})
     if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=404, detail="User not found or already approved")
+    invalidate_user(user_id)
+
+    # Delivered by the email worker; approval does not wait on SMTP
+    user = await users_repo.find_by_id(user_id, {"email": 1})
+    await send_approval_email(user["email"])
+    email_worker.notify()
     return {"message": "User approved successfully"}
 
+MAX_BULK_USERS = 1000
+
+class BulkUserAction(BaseModel):
+    action: str = Field(..., regex="^(approve|reject)$")
+    # Either explicit ids or every pending user who signed up before a date
+    ids: Optional[List[str]] = Field(None, max_items=MAX_BULK_USERS)
+    pending_before: Optional[datetime] = None
+
+@router.post("/users/bulk")
+async def bulk_user_action(
+    request: BulkUserAction,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Approve or reject (delete) many pending users at once"""
+    if (request.ids is None) == (request.pending_before is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either ids or pending_before"
+        )
+    
+    if request.ids is not None:
+        object_ids = list({ObjectId(user_id) for user_id in request.ids if ObjectId.is_valid(user_id)})
+        query = {"_id": {"$in": object_ids}}
+        matched = await users_repo.count(query)
+        not_found = len(set(request.ids)) - matched
+    else:
+        query = {"created_at": {"$lt": request.pending_before}}
+        matched = None
+        not_found = 0
+    
+    emails_queued = 0
+    if request.action == "approve":
+        modified, users = await users_repo.approve_pending(query)
+        user_ids = [user["_id"] for user in users]
+        if users:
+            # One outbox insert for the whole batch
+            emails_queued = await send_approval_emails([user["email"] for user in users])
+            email_worker.notify()
+    else:
+        modified, user_ids = await users_repo.delete_pending(query)
+    invalidate_users(user_ids)
+    
+    return {
+        "action": request.action,
+        "matched": modified if matched is None else matched,
+        "modified": modified,
+        "not_found": not_found,
+        "emails_queued": emails_queued
+    }
+
 @router.get("/users/approved")
 async def get_approved_users(current_user: dict = Depends(get_current_admin_user)):
-    db = get_db()
     # Only get approved users who are not admins
     query = {
         "is_approved": True,
         "is_admin": {"$ne": True}  # Explicitly exclude admin users
     }
     
-    users = list(db.users.find(query, {"hashed_password": 0}))
+    users = await users_repo.find_many(query, {"hashed_password": 0})
     
     result = [
         {
@@ -80,10 +188,8 @@ async def get_approved_users(current_user: dict = Depends(get_current_admin_user
 
 @router.get("/users/admins")
 async def get_admin_users(current_user: dict = Depends(get_current_admin_user)):
-    db = get_db()
-    
     query = {"is_admin": True}
-    users = list(db.users.find(query, {"hashed_password": 0}))
+    users = await users_repo.find_many(query, {"hashed_password": 0})
     
     result = [
         {
@@ -117,8 +223,7 @@ async def toggle_admin_status(
             detail="You cannot remove your own admin status for security reasons"
         )
 
-    db = get_db()
-    user = db.users.find_one({"_id": ObjectId(user_id)})
+    user = await users_repo.find_by_id(user_id)
     
     if not user:
         raise HTTPException(
@@ -128,18 +233,57 @@ async def toggle_admin_status(
     
     # Toggle admin status
     new_status = not user.get("is_admin", False)
-    result = db.users.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$set": {
-            "is_admin": new_status,
-            "updated_at": datetime.utcnow()
-        }}
+    result = await users_repo.update_roles(
+        user_id,
+        {"is_admin": new_status, "updated_at": datetime.utcnow()},
+        expected={"is_admin": {"$ne": True} if new_status else True}
     )
     
     if result.modified_count == 0:
+        # Another request changed the admin status since it was read
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update admin status"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Admin status was changed by another request"
         )
+    invalidate_user(user_id)
     
-    return {"message": f"Admin status {'granted' if new_status else 'revoked'} successfully"} 
\ No newline at end of file
+    return {"message": f"Admin status {'granted' if new_status else 'revoked'} successfully"} 
+
+@router.get("/metrics/bunny")
+async def get_bunny_metrics(current_user: dict = Depends(get_current_admin_user)):
+    """Latency and error counters per Bunny.net endpoint, plus circuit state"""
+    return bunny_service.client.metrics()
+
+@router.post("/bunny/sync", status_code=status.HTTP_202_ACCEPTED)
+async def start_bunny_sync(
+    full: bool = False,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Start a Bunny.net library sync in the background"""
+    if bunny_sync.start(full=full) is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A Bunny.net sync is already running"
+        )
+    return {"message": f"{'Full' if full else 'Incremental'} Bunny.net sync started"}
+
+@router.get("/export")
+async def export_catalog(
+    collection: str = Query("all", regex="^(all|albums|videos)$"),
+    fields: Optional[str] = Query(None, description="comma-separated fields to include"),
+    since: Optional[datetime] = Query(None, description="only documents updated at or after this time"),
+    gzip: bool = False,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Stream albums and/or videos as NDJSON, one document per line"""
+    collections = EXPORT_COLLECTIONS if collection == "all" else (collection,)
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    body = export_ndjson(collections, field_list, since, tag_collection=collection == "all")
+    headers = {
+        "Content-Disposition": f'attachment; filename="{collection}.ndjson"',
+        "Cache-Control": "no-store"
+    }
+    if gzip:
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
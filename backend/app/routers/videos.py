@@ -1,13 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
 from ..models.video import VideoCreate, Video, AlbumCreate, Album
 from ..utils.auth import get_current_user, get_current_admin_user
-from ..utils.db import get_db
+from ..repositories.albums import albums_repo
+from ..repositories.videos import videos_repo
+from ..repositories.catalog_versions import catalog_versions_repo, album_key, ALBUMS, VIDEOS
+from ..utils.etag import conditional_response, make_etag
+from ..utils.responses import json_response, trusted_payload
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, paginate
+from ..utils.cache import TTLCache
 from datetime import datetime
+import os
 import uuid
 from bson import ObjectId
 import secrets
-from ..services.bunny_service import BunnyService
-from typing import Optional
+from ..services.upload_jobs import upload_jobs, serialize_job
+from ..services.bunny_service import bunny_service
+from ..services.album_stats import add_video, add_videos
+from ..services.title_index import title_index, ALBUM, MAX_SUGGESTIONS
+from ..services.playback_progress import progress_buffer
+from ..repositories.playback_progress import playback_progress_repo
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from pydantic import BaseModel, Field, ValidationError
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -15,8 +34,6 @@ router = APIRouter()
 def generate_share_token():
     return secrets.token_urlsafe(16)
 
-bunny_service = BunnyService()
-
 @router.post("/albums", response_model=Album)
 async def create_album(album: AlbumCreate, current_user=Depends(get_current_user)):
     try:
@@ -29,7 +46,6 @@ async def create_album(album: AlbumCreate, current_user=Depends(get_current_user
         print(f"Creating album with data: {album.dict()}")  # Debug log
         print(f"Current user: {current_user}")  # Debug log
         
-        db = get_db()
         album_dict = album.dict()
         album_dict.update({
             "id": str(ObjectId()),
@@ -42,8 +58,9 @@ async def create_album(album: AlbumCreate, current_user=Depends(get_current_user
         
         print(f"Album dict before insert: {album_dict}")  # Debug log
         
-        result = db.albums.insert_one(album_dict)
-        album_dict["_id"] = str(result.inserted_id)
+        inserted_id = await albums_repo.insert(album_dict)
+        album_dict["_id"] = str(inserted_id)
+        title_index.add(ALBUM, album_dict["id"], album_dict["title"])
         
         print(f"Album created: {album_dict}")  # Debug log
         
@@ -63,7 +80,6 @@ async def create_video(video: VideoCreate, current_user=Depends(get_current_user
             detail="Only admins can upload videos"
         )
     
-    db = get_db()
     video_dict = video.dict()
     print(f"Creating video with data: {video_dict}")  # Debug log
     
@@ -76,7 +92,7 @@ async def create_video(video: VideoCreate, current_user=Depends(get_current_user
     })
     
     if video.album_id:
-        album = db.albums.find_one({"id": video.album_id})
+        album = await albums_repo.find_by_id(video.album_id)
         print(f"Found album for video: {album}")  # Debug log
         if not album:
             raise HTTPException(
@@ -85,20 +101,167 @@ async def create_video(video: VideoCreate, current_user=Depends(get_current_user
             )
         # Make sure album_id is included in video_dict
         video_dict["album_id"] = video.album_id
-        db.albums.update_one(
-            {"id": video.album_id},
-            {"$inc": {"video_count": 1}}
-        )
     
-    result = db.videos.insert_one(video_dict)
-    video_dict["_id"] = str(result.inserted_id)
+    inserted_id = await add_video(video_dict)
+    video_dict["_id"] = str(inserted_id)
     print(f"Created video: {video_dict}")  # Debug log
     return Video(**video_dict)
 
+MAX_BULK_VIDEOS = 500
+
+class BulkVideoRequest(BaseModel):
+    # Validated item by item so one bad entry does not reject the rest
+    videos: List[dict] = Field(..., max_items=MAX_BULK_VIDEOS)
+
+@router.post("/videos/bulk")
+async def create_videos_bulk(request: BulkVideoRequest, current_user=Depends(get_current_user)):
+    """Create many videos at once; returns a result per item, in request order"""
+    if not current_user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can upload videos"
+        )
+    
+    results = [None] * len(request.videos)
+    valid = []
+    for index, item in enumerate(request.videos):
+        try:
+            valid.append((index, VideoCreate(**item)))
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "invalid", "errors": e.errors()}
+    
+    # Resolve every referenced album with one query
+    requested = {video.album_id for _, video in valid if video.album_id}
+    found = set()
+    if requested:
+        for album in await albums_repo.find_by_ids(list(requested)):
+            found.update({album.get("id"), str(album["_id"])} & requested)
+    
+    now = datetime.utcnow()
+    pending = []
+    for index, video in valid:
+        if video.album_id and video.album_id not in found:
+            results[index] = {"index": index, "status": "album_not_found", "album_id": video.album_id}
+            continue
+        video_dict = video.dict()
+        video_dict.update({
+            "id": str(ObjectId()),
+            "created_by": current_user["sub"],
+            "created_at": now,
+            "updated_at": now,
+            "share_token": str(uuid.uuid4())
+        })
+        pending.append((index, video_dict))
+    
+    failed = await add_videos([video_dict for _, video_dict in pending]) if pending else {}
+    for position, (index, video_dict) in enumerate(pending):
+        if position in failed:
+            results[index] = {"index": index, "status": "failed", "error": failed[position]}
+        else:
+            results[index] = {"index": index, "status": "created", "video": trusted_payload(Video, video_dict)}
+    
+    created = len(pending) - len(failed)
+    logger.info(f"Bulk created {created} of {len(results)} videos")
+    return json_response({"created": created, "failed": len(results) - created, "results": results})
+
+MAX_STATUS_BATCH = 100
+
+class VideoStatusRequest(BaseModel):
+    ids: List[str] = Field(..., max_items=MAX_STATUS_BATCH)
+
+def summarize_bunny_info(info: Optional[dict]) -> Optional[dict]:
+    if not info:
+        return None
+    return {
+        "status": info.get("status"),
+        "encode_progress": info.get("encodeProgress"),
+        "duration": info.get("length"),
+        "width": info.get("width"),
+        "height": info.get("height"),
+        "size": info.get("storageSize")
+    }
+
+@router.post("/videos/status")
+async def get_videos_status(request: VideoStatusRequest, current_user=Depends(get_current_user)):
+    """Encoding status, duration and resolution of several videos from Bunny.net"""
+    if not current_user["is_approved"] and not current_user["is_admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User not approved"
+        )
+    
+    videos = await videos_repo.find_by_ids(request.ids, {"id": 1, "video_id": 1})
+    bunny_ids = {video["id"]: video["video_id"] for video in videos if video.get("video_id")}
+    infos = await bunny_service.get_videos_info(bunny_ids.values())
+    
+    return {
+        video_id: summarize_bunny_info(infos.get(bunny_ids[video_id])) if video_id in bunny_ids else None
+        for video_id in request.ids
+    }
+
+# Relevance order has no stable key to continue from, so search pages are
+# offsets; the cap bounds the cost of skipping
+MAX_SEARCH_OFFSET = 1000
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "30"))
+_search_cache = TTLCache(int(os.getenv("SEARCH_CACHE_MAX_SIZE", "1000")), SEARCH_CACHE_TTL_SECONDS)
+
+@router.get("/videos/search")
+async def search_videos(
+    response: Response,
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Videos matching q in title or description, most relevant first; next page cursor in X-Next-Cursor"""
+    if not current_user.get("is_approved") and not current_user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User not approved"
+        )
+    
+    offset = decode_cursor(after, str) if after else "0"
+    if not offset.isdigit() or int(offset) > MAX_SEARCH_OFFSET:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    offset = int(offset)
+    
+    key = (" ".join(q.lower().split()), limit, offset)
+    page = _search_cache.get(key)
+    if page is None:
+        videos = await videos_repo.search(q, limit=limit + 1, skip=offset)
+        next_cursor = None
+        if len(videos) > limit and offset + limit <= MAX_SEARCH_OFFSET:
+            next_cursor = encode_cursor(str(offset + limit))
+        page = (videos[:limit], next_cursor)
+        _search_cache.set(key, page)
+    
+    videos, next_cursor = page
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    response.headers["Cache-Control"] = f"private, max-age={int(SEARCH_CACHE_TTL_SECONDS)}"
+    return json_response(videos, response)
+
+@router.get("/suggest")
+async def suggest_titles(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    current_user: dict = Depends(get_current_user)
+):
+    """Album and video titles matching a typed prefix, served from memory"""
+    if not current_user.get("is_approved") and not current_user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User not approved"
+        )
+    
+    return json_response(title_index.suggest(prefix, limit))
+
 @router.get("/videos/{video_id}")
 async def get_video(video_id: str, current_user=Depends(get_current_user)):
-    db = get_db()
-    video = db.videos.find_one({"id": video_id})
+    video = await videos_repo.find_by_id(video_id)
     
     if not video:
         raise HTTPException(
@@ -112,7 +275,41 @@ async def get_video(video_id: str, current_user=Depends(get_current_user)):
             detail="User not approved"
         )
     
-    return Video(**video)
+    return json_response(trusted_payload(Video, video))
+
+# video id -> album id, so heartbeats do not look the video up every time
+_video_albums = TTLCache(int(os.getenv("PROGRESS_VIDEO_CACHE_SIZE", "10000")), 3600)
+
+class ProgressUpdate(BaseModel):
+    position: float = Field(..., ge=0)
+    duration: Optional[float] = Field(None, gt=0)
+
+@router.post("/videos/{video_id}/progress", status_code=status.HTTP_202_ACCEPTED)
+async def record_progress(
+    video_id: str,
+    progress: ProgressUpdate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Playback heartbeat; buffered in memory and written in batches"""
+    if not current_user.get("is_approved") and not current_user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User not approved"
+        )
+    
+    album_id = _video_albums.get(video_id)
+    if album_id is None:
+        video = await videos_repo.find_by_id(video_id)
+        if not video:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Video not found"
+            )
+        album_id = video.get("album_id") or ""
+        _video_albums.set(video_id, album_id)
+    
+    progress_buffer.record(current_user["sub"], video_id, album_id or None, progress.position, progress.duration)
+    return {"message": "Progress recorded"}
 
 @router.get("/videos/share/{share_token}")
 async def get_shared_video(share_token: str, current_user=Depends(get_current_user)):
@@ -122,8 +319,7 @@ async def get_shared_video(share_token: str, current_user=Depends(get_current_us
             detail="User not approved"
         )
     
-    db = get_db()
-    video = db.videos.find_one({"share_token": share_token})
+    video = await videos_repo.find_by_share_token(share_token)
     
     if not video:
         raise HTTPException(
@@ -131,18 +327,31 @@ async def get_shared_video(share_token: str, current_user=Depends(get_current_us
             detail="Video not found"
         )
     
-    return Video(**video)
+    return json_response(trusted_payload(Video, video))
 
 @router.get("/albums")
-async def get_albums(current_user: dict = Depends(get_current_user)):
+async def get_albums(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Page of active albums; the next page's cursor is in X-Next-Cursor"""
     if not current_user.get("is_approved") and not current_user.get("is_admin"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User not approved"
         )
     
-    db = get_db()
-    albums = list(db.albums.find({"is_active": True}))
+    after_id = decode_cursor(after)
+    etag = make_etag(ALBUMS, await catalog_versions_repo.get(ALBUMS), limit, after)
+    not_modified = conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    albums = await albums_repo.list_active(limit=limit + 1, after=after_id)
+    albums = paginate(response, albums, limit)
     
     # Convert ObjectId to string for JSON serialization
     for album in albums:
@@ -152,25 +361,79 @@ async def get_albums(current_user: dict = Depends(get_current_user)):
         if "id" not in album:
             album["id"] = str(album["_id"])
     
-    return albums
+    return json_response(albums, response)
 
 @router.get("/albums/{album_id}/videos")
-async def get_album_videos(album_id: str):
+async def get_album_videos(
+    album_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Page of an album's videos; the next page's cursor is in X-Next-Cursor"""
+    if not current_user.get("is_approved") and not current_user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User not approved"
+        )
+    
+    after_id = decode_cursor(after)
     try:
         # Convert string ID to ObjectId
         album_object_id = ObjectId(album_id)
-        db = get_db()
-        videos = list(db.videos.find({"album_id": str(album_object_id)}))
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    album_id = str(album_object_id)
+    versions = await catalog_versions_repo.get_many([VIDEOS, album_key(album_id)])
+    etag = make_etag(album_id, versions[VIDEOS], versions[album_key(album_id)], limit, after)
+    not_modified = conditional_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    try:
+        videos = await videos_repo.list_by_album(album_id, limit=limit + 1, after=after_id)
+        videos = paginate(response, videos, limit)
         
         # Convert ObjectId to string for JSON response
         for video in videos:
             video["_id"] = str(video["_id"])
             video["created_by"] = str(video["created_by"])
             
-        return videos
+        return json_response(videos, response)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@router.get("/albums/{album_id}/progress")
+async def get_album_progress(album_id: str, current_user: dict = Depends(get_current_user)):
+    """The current user's resume positions in an album's videos, by video id"""
+    if not current_user.get("is_approved") and not current_user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User not approved"
+        )
+    
+    positions = {
+        entry["video_id"]: entry
+        for entry in await playback_progress_repo.list_for_album(current_user["sub"], album_id)
+    }
+    # Heartbeats not flushed yet are newer than what is stored
+    for video_id, entry in progress_buffer.pending_for_album(current_user["sub"], album_id).items():
+        positions[video_id] = entry
+    
+    result = {
+        video_id: {
+            "position": entry["position"],
+            "duration": entry.get("duration"),
+            "completed": entry.get("completed", False),
+            "updated_at": entry["reported_at"]
+        }
+        for video_id, entry in positions.items()
+    }
+    return json_response(result)
+
 @router.post("/videos/{video_id}/share")
 async def generate_share_link(
     video_id: str,
@@ -178,16 +441,10 @@ async def generate_share_link(
 ):
     """Generate a share token for a video"""
     try:
-        db = get_db()
-        
         # Add debug logging
         print(f"Looking for video with ID: {video_id}")
         
-        # Get all videos to check the data structure
-        all_videos = list(db.videos.find({}))
-        print(f"All videos in DB: {all_videos}")
-        
-        video = db.videos.find_one({"id": video_id})
+        video = await videos_repo.find_by_id(video_id)
         print(f"Found video: {video}")
         
         if not video:
@@ -201,11 +458,8 @@ async def generate_share_link(
         print(f"Generated share token: {share_token}")
         
         # Update video
-        result = db.videos.update_one(
-            {"id": video_id},
-            {"$set": {"share_token": share_token}}
-        )
-        print(f"Update result: {result.modified_count} documents modified")
+        await videos_repo.set_share_token(video_id, share_token)
+        logger.info(f"Rotated share token of video {video_id}")
         
         return {
             "share_token": share_token,
@@ -222,10 +476,9 @@ async def generate_share_link(
 async def get_shared_video(share_token: str, current_user: dict = Depends(get_current_user)):
     """Get video by share token"""
     try:
-        db = get_db()
         print(f"Looking for video with share token: {share_token}")  # Debug log
         
-        video = db.videos.find_one({"share_token": share_token})
+        video = await videos_repo.find_by_share_token(share_token)
         print(f"Found video: {video}")  # Debug log
         
         if not video:
@@ -239,7 +492,7 @@ async def get_shared_video(share_token: str, current_user: dict = Depends(get_cu
         if "created_by" in video:
             video["created_by"] = str(video["created_by"])
             
-        return video
+        return json_response(video)
     except Exception as e:
         print(f"Error getting shared video: {str(e)}")  # Debug log
         raise HTTPException(
@@ -247,7 +500,7 @@ async def get_shared_video(share_token: str, current_user: dict = Depends(get_cu
             detail=str(e)
         )
 
-@router.post("/videos/upload")
+@router.post("/videos/upload", status_code=status.HTTP_202_ACCEPTED)
 async def upload_video(
     title: str,
     description: Optional[str] = None,
@@ -255,44 +508,42 @@ async def upload_video(
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user)
 ):
+    """Stage a video and queue its upload to Bunny.net; returns the job to poll"""
     if not current_user.get("is_admin"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only admins can upload videos"
         )
     
-    # Upload to Bunny.net
-    bunny_response = await bunny_service.upload_video(file, title)
-    if not bunny_response:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to upload video"
-        )
+    job = await upload_jobs.submit(file, title, description, album_id, current_user["sub"])
+    job_id = str(job["_id"])
     
-    # Create video document in your database
-    video_data = {
-        "title": title,
-        "description": description,
-        "url": bunny_response["url"],
-        "thumbnail_url": bunny_response["thumbnail"],
-        "video_id": bunny_response["video_id"],
-        "album_id": album_id,
-        "created_by": current_user["sub"],
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
+    return {
+        **serialize_job(job),
+        "status_url": f"/api/videos/jobs/{job_id}",
+        "events_url": f"/api/videos/jobs/{job_id}/events"
     }
-    
-    db = get_db()
-    result = db.videos.insert_one(video_data)
-    
-    # Update album video count if needed
-    if album_id:
-        db.albums.update_one(
-            {"_id": ObjectId(album_id)},
-            {"$inc": {"video_count": 1}}
+
+async def _get_upload_job(job_id: str) -> dict:
+    job = await upload_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
         )
-    
-    return {
-        "id": str(result.inserted_id),
-        **video_data
-    } 
\ No newline at end of file
+    return job
+
+@router.get("/jobs/{job_id}")
+async def get_upload_job(job_id: str, current_user: dict = Depends(get_current_admin_user)):
+    """Current state of an upload job"""
+    return serialize_job(await _get_upload_job(job_id))
+
+@router.get("/jobs/{job_id}/events")
+async def get_upload_job_events(job_id: str, current_user: dict = Depends(get_current_admin_user)):
+    """Server-sent events stream of an upload job's progress"""
+    await _get_upload_job(job_id)
+    return StreamingResponse(
+        upload_jobs.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,20 @@
+import asyncio
+from ..utils.db import init_db, close_db, close_async_db
+from ..services.catalog_export import backfill_updated_at
+
+async def run() -> dict:
+    try:
+        return await backfill_updated_at()
+    finally:
+        close_async_db()
+
+def main():
+    init_db()
+    close_db()
+
+    counts = asyncio.run(run())
+    for name, count in counts.items():
+        print(f"Set updated_at on {count} {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import sys
+from ..utils.db import init_db, close_db
+from ..utils.indexes import check_query_plans
+
+def main():
+    # init_db() also creates the indexes, so this can run against a fresh database
+    db = init_db()
+    try:
+        failures = check_query_plans(db)
+    finally:
+        close_db()
+
+    if failures:
+        print("Queries not bounded by an index (COLLSCAN or full index scan):")
+        for name in failures:
+            print(f"  - {name}")
+        sys.exit(1)
+    print("All hot queries use an index")
+
+if __name__ == "__main__":
+    main()
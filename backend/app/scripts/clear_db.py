@@ -1,17 +1,14 @@
-from pymongo import MongoClient
 import os
 from dotenv import load_dotenv
+from ..utils.db import get_client, close_db
 
 load_dotenv()
 
 def clear_database():
-    # Get MongoDB URL from environment variable
-    mongodb_url = os.getenv('MONGODB_URL', 'mongodb://localhost:27017')
     database_name = os.getenv('DATABASE_NAME', 'video_portal_test')
     
-    # Connect to MongoDB
-    client = MongoClient(mongodb_url)
-    db = client[database_name]
+    # Connect to MongoDB using the shared client (MONGODB_URL from environment)
+    db = get_client()[database_name]
     
     # Collections to clear
     collections = ['videos', 'albums', 'users']
@@ -26,7 +23,7 @@ def clear_database():
     except Exception as e:
         print(f"Error clearing database: {str(e)}")
     finally:
-        client.close()
+        close_db()
 
 if __name__ == "__main__":
     confirm = input("This will clear all data from the database. Are you sure? (y/n): ")
@@ -0,0 +1,51 @@
+import sys
+import asyncio
+import argparse
+from ..utils.db import init_db, close_db, close_async_db
+from ..services.catalog_import import CatalogImporter, IMPORT_BATCH_SIZE
+
+def print_progress(report: dict):
+    print(f"  {report['rows']} rows, {report['invalid']} invalid ({report['rows_per_second']} rows/s)")
+
+async def run(importer: CatalogImporter) -> dict:
+    try:
+        return await importer.run(progress=print_progress)
+    finally:
+        close_async_db()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import albums and videos from a JSONL or CSV manifest. "
+                    "Rows need type (album or video) and key; videos give their album's key in album."
+    )
+    parser.add_argument("manifest")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--checkpoint", help="default: <manifest>.checkpoint")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    # init_db() creates the import_key indexes the upserts rely on
+    init_db()
+    close_db()
+
+    importer = CatalogImporter(args.manifest, args.format, args.batch_size, args.checkpoint)
+    if args.restart:
+        importer.checkpoint.remove()
+        importer.checkpoint.line = 0
+        importer.checkpoint.albums = set()
+
+    report = asyncio.run(run(importer))
+    for line_number, error in importer.errors:
+        print(f"line {line_number}: {error}")
+    print(
+        f"Imported {report['albums']} albums and {report['videos']} videos "
+        f"({report['inserted']} new, {report['updated']} changed, {report['invalid']} invalid rows, "
+        f"{report['skipped']} skipped from a previous run) in {report['seconds']}s, "
+        f"{report['rows_per_second']} rows/s"
+    )
+    print(f"Reconciled stats of {report['albums_reconciled']} albums")
+    sys.exit(1 if report["invalid"] else 0)
+
+if __name__ == "__main__":
+    main()
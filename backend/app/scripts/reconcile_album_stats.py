@@ -0,0 +1,29 @@
+import time
+import asyncio
+import argparse
+from ..utils.db import init_db, close_db, close_async_db
+from ..services.album_stats import reconcile, ALBUM_STATS_BATCH_SIZE
+
+async def run(album_ids, batch_size: int) -> int:
+    try:
+        return await reconcile(album_ids, batch_size=batch_size)
+    finally:
+        close_async_db()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recompute album video counts, latest video, cover and total duration"
+    )
+    parser.add_argument("--album", action="append", dest="albums", help="only this album id (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=ALBUM_STATS_BATCH_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    close_db()
+
+    started = time.perf_counter()
+    changed = asyncio.run(run(args.albums, args.batch_size))
+    print(f"Updated stats of {changed} albums in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import sys
+import asyncio
+import argparse
+from ..utils.db import init_db, close_db, close_async_db
+from ..services.bunny_client import BunnyUnavailableError
+from ..services.bunny_service import bunny_service
+from ..services.bunny_sync import bunny_sync
+
+async def run(full: bool) -> dict:
+    try:
+        return await bunny_sync.run(full=full)
+    finally:
+        await bunny_service.close()
+        close_async_db()
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync Bunny.net video metadata into MongoDB")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="walk the whole library and flag videos missing from Bunny.net"
+    )
+    args = parser.parse_args()
+
+    # init_db() creates the video_id index the sync relies on
+    init_db()
+    close_db()
+
+    try:
+        stats = asyncio.run(run(args.full))
+    except BunnyUnavailableError as e:
+        print(f"Sync aborted: {e}")
+        sys.exit(1)
+
+    print(
+        f"Listed {stats['listed']} Bunny videos over {stats['pages']} pages in {stats['seconds']}s: "
+        f"{stats['matched']} matched, {stats['modified']} updated, {stats['refreshed']} re-checked, "
+        f"{stats['albums_reconciled']} album stats refreshed"
+    )
+    print(f"In Bunny only: {stats['bunny_orphans']}, missing from Bunny: {stats['portal_orphans']}")
+
+if __name__ == "__main__":
+    main()
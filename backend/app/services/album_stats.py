@@ -0,0 +1,207 @@
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from pymongo.errors import PyMongoError
+from pymongo import UpdateOne
+from ..repositories.albums import albums_repo, album_filter, public_album_id
+from ..repositories.videos import videos_repo
+from ..repositories.catalog_versions import catalog_versions_repo, album_key, ALBUMS
+from ..utils.db import get_async_client
+from ..utils.updates import changed_pipeline
+from .title_index import title_index
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Insert a video and update its album's stats in one transaction. Needs a
+# replica set (a single-node one is enough); without it the two writes are
+# separate and reconcile() repairs any drift.
+ALBUM_STATS_TRANSACTIONS = os.getenv("ALBUM_STATS_TRANSACTIONS", "false").lower() == "true"
+ALBUM_STATS_BATCH_SIZE = int(os.getenv("ALBUM_STATS_BATCH_SIZE", "200"))
+
+# Album fields maintained here
+EMPTY_STATS = {
+    "video_count": 0,
+    "total_duration": 0,
+    "latest_video": None,
+    "cover_thumbnail_url": None,
+    "cover_created_at": None
+}
+
+def latest_video_summary(video: dict) -> dict:
+    return {
+        "id": video.get("id") or str(video.get("_id")),
+        "title": video.get("title"),
+        "created_at": video.get("created_at"),
+        "thumbnail_url": video.get("thumbnail_url")
+    }
+
+def videos_added_pipeline(videos: List[dict]) -> list:
+    """Update pipeline folding new videos of one album into its stats.
+
+    A single-document update, so concurrent additions never lose counts.
+    The latest video and cover only move forward in created_at.
+    """
+    now = datetime.utcnow()
+    newest = max(videos, key=lambda video: video.get("created_at") or now)
+    created_at = newest.get("created_at") or now
+    is_latest = {"$gte": [created_at, "$latest_video.created_at"]}
+    latest = dict(latest_video_summary(newest), created_at=created_at)
+    stats = {
+        "video_count": {"$add": [{"$ifNull": ["$video_count", 0]}, len(videos)]},
+        "total_duration": {"$add": [
+            {"$ifNull": ["$total_duration", 0]},
+            sum(video.get("duration") or 0 for video in videos)
+        ]},
+        "latest_video": {"$cond": [is_latest, {"$literal": latest}, "$latest_video"]},
+        "updated_at": now
+    }
+    covers = [video for video in videos if video.get("thumbnail_url")]
+    if covers:
+        cover = max(covers, key=lambda video: video.get("created_at") or now)
+        cover_created_at = cover.get("created_at") or now
+        is_cover = {"$gte": [cover_created_at, "$cover_created_at"]}
+        stats["cover_thumbnail_url"] = {"$cond": [is_cover, {"$literal": cover["thumbnail_url"]}, "$cover_thumbnail_url"]}
+        stats["cover_created_at"] = {"$cond": [is_cover, cover_created_at, "$cover_created_at"]}
+    return [{"$set": stats}]
+
+def stats_pipeline(album_ids: List[str]) -> list:
+    """Aggregation computing the stats of the given albums from their videos.
+
+    Uses $max over sub-documents that start with created_at instead of a
+    sort, so no album needs its videos sorted in memory.
+    """
+    return [
+        {"$match": {"album_id": {"$in": album_ids}}},
+        {"$group": {
+            "_id": "$album_id",
+            "video_count": {"$sum": 1},
+            "total_duration": {"$sum": "$duration"},
+            "latest_video": {"$max": {
+                "created_at": "$created_at",
+                "id": {"$ifNull": ["$id", {"$toString": "$_id"}]},
+                "title": "$title",
+                "thumbnail_url": "$thumbnail_url"
+            }},
+            "cover": {"$max": {"$cond": [
+                {"$ifNull": ["$thumbnail_url", False]},
+                {"created_at": "$created_at", "url": "$thumbnail_url"},
+                None
+            ]}}
+        }}
+    ]
+
+def stats_fields(row: Optional[dict]) -> dict:
+    """Album fields from a stats_pipeline() result row (None: no videos)"""
+    if row is None:
+        return dict(EMPTY_STATS)
+    latest = row["latest_video"]
+    cover = row.get("cover") or {}
+    return {
+        "video_count": row["video_count"],
+        "total_duration": row["total_duration"],
+        "latest_video": {
+            "id": latest.get("id"),
+            "title": latest.get("title"),
+            "created_at": latest.get("created_at"),
+            "thumbnail_url": latest.get("thumbnail_url")
+        },
+        "cover_thumbnail_url": cover.get("url"),
+        "cover_created_at": cover.get("created_at")
+    }
+
+async def add_video(video: dict):
+    """Insert a video and update its album's stats; returns the inserted _id"""
+    album_id = video.get("album_id")
+    if not album_id:
+        inserted_id = await videos_repo.insert(video)
+        title_index.add_videos([video])
+        return inserted_id
+
+    if not ALBUM_STATS_TRANSACTIONS:
+        inserted_id = await videos_repo.insert(video)
+        title_index.add_videos([video])
+        await albums_repo.apply_stats_update(album_id, videos_added_pipeline([video]))
+        return inserted_id
+
+    async with await get_async_client().start_session() as session:
+        async with session.start_transaction():
+            inserted_id = await videos_repo.insert(video, session=session)
+            await albums_repo.apply_stats_update(album_id, videos_added_pipeline([video]), session=session)
+    title_index.add_videos([video])
+    await catalog_versions_repo.bump(ALBUMS, album_key(album_id))
+    return inserted_id
+
+async def add_videos(videos: List[dict]) -> Dict[int, str]:
+    """Insert many videos with one insert_many and update each album once.
+
+    Returns error messages by index of the videos that were not inserted.
+    """
+    by_album = {}
+    if not ALBUM_STATS_TRANSACTIONS:
+        failed = await videos_repo.insert_many(videos)
+        title_index.add_videos([video for index, video in enumerate(videos) if index not in failed])
+        for index, video in enumerate(videos):
+            if index not in failed and video.get("album_id"):
+                by_album.setdefault(video["album_id"], []).append(video)
+        for album_id, album_videos in by_album.items():
+            await albums_repo.apply_stats_update(album_id, videos_added_pipeline(album_videos))
+        return failed
+
+    for video in videos:
+        if video.get("album_id"):
+            by_album.setdefault(video["album_id"], []).append(video)
+    try:
+        async with await get_async_client().start_session() as session:
+            async with session.start_transaction():
+                await videos_repo.insert_many(videos, session=session)
+                for album_id, album_videos in by_album.items():
+                    await albums_repo.apply_stats_update(album_id, videos_added_pipeline(album_videos), session=session)
+    except PyMongoError as e:
+        # The transaction was rolled back: nothing was inserted
+        return {index: str(e) for index in range(len(videos))}
+    title_index.add_videos(videos)
+    await catalog_versions_repo.bump(ALBUMS, *(album_key(album_id) for album_id in by_album))
+    return {}
+
+async def reconcile(album_ids: Optional[Iterable[str]] = None, batch_size: int = ALBUM_STATS_BATCH_SIZE) -> int:
+    """Recompute album stats from the videos collection, batch by batch.
+
+    Each batch costs one aggregation and one bulk write. With album_ids only
+    those albums are recomputed, otherwise every album. Returns the number of
+    albums whose stats changed.
+    """
+    changed = 0
+    if album_ids is not None:
+        album_ids = list(dict.fromkeys(album_ids))
+        for start in range(0, len(album_ids), batch_size):
+            changed += await _reconcile_batch(album_ids[start:start + batch_size])
+        return changed
+
+    after = None
+    while True:
+        albums = await albums_repo.list_ids(batch_size, after)
+        if not albums:
+            break
+        changed += await _reconcile_batch([public_album_id(album) for album in albums])
+        after = albums[-1]["_id"]
+    return changed
+
+async def _reconcile_batch(album_ids: List[str]) -> int:
+    rows = {
+        row["_id"]: row
+        async for row in videos_repo.collection.aggregate(stats_pipeline(album_ids))
+    }
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(album_filter(album_id), changed_pipeline(stats_fields(rows.get(album_id)), now))
+        for album_id in album_ids
+    ]
+    if not operations:
+        return 0
+    result = await albums_repo.bulk_write(operations)
+    if result.modified_count:
+        logger.info(f"Reconciled stats of {result.modified_count} of {len(album_ids)} albums")
+    return result.modified_count
@@ -0,0 +1,242 @@
+import os
+import time
+import random
+import asyncio
+import httpx
+from typing import Optional
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUNNY_MAX_CONNECTIONS = int(os.getenv("BUNNY_MAX_CONNECTIONS", "20"))
+BUNNY_MAX_KEEPALIVE = int(os.getenv("BUNNY_MAX_KEEPALIVE", "10"))
+BUNNY_CONNECT_TIMEOUT = float(os.getenv("BUNNY_CONNECT_TIMEOUT", "5"))
+BUNNY_API_TIMEOUT = float(os.getenv("BUNNY_API_TIMEOUT", "10"))
+BUNNY_MAX_RETRIES = int(os.getenv("BUNNY_MAX_RETRIES", "3"))
+BUNNY_RETRY_BASE_DELAY = float(os.getenv("BUNNY_RETRY_BASE_DELAY", "0.2"))
+BUNNY_RETRY_MAX_DELAY = float(os.getenv("BUNNY_RETRY_MAX_DELAY", "5"))
+# Consecutive failures that open the circuit, and how long it stays open
+BUNNY_BREAKER_THRESHOLD = int(os.getenv("BUNNY_BREAKER_THRESHOLD", "5"))
+BUNNY_BREAKER_RESET_SECONDS = float(os.getenv("BUNNY_BREAKER_RESET_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class BunnyUnavailableError(Exception):
+    """Bunny.net is failing or the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Fails fast after repeated upstream failures.
+
+    Closed: calls go through. After `failure_threshold` consecutive failures
+    it opens and rejects calls for `reset_timeout` seconds, then lets a single
+    trial call through (half-open); its outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go through; a half-open trial must be released"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self):
+        """End a trial call whatever its outcome, so the next one can run"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning("Bunny.net circuit breaker opened")
+            self.opened_at = time.monotonic()
+
+class EndpointMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float, error: bool):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if error:
+            self.errors += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 1)
+        }
+
+class BunnyClient:
+    """Shared, pooled HTTP client for the Bunny.net API.
+
+    Idempotent calls are retried on transient errors with jittered
+    exponential backoff; other calls are only retried when the connection
+    could not be made, since the request was then never sent.
+    """
+
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_retries: int = BUNNY_MAX_RETRIES,
+        retry_base_delay: float = BUNNY_RETRY_BASE_DELAY,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.transport = transport
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.breaker = breaker or CircuitBreaker(BUNNY_BREAKER_THRESHOLD, BUNNY_BREAKER_RESET_SECONDS)
+        self._metrics = {}
+        self._client = None
+        self._client_loop = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        # Pooled connections belong to the loop that opened them
+        loop = asyncio.get_event_loop()
+        if self._client is None or self._client_loop is not loop:
+            if self._client is not None:
+                try:
+                    await self._client.aclose()
+                except Exception as e:
+                    logger.warning(f"Could not close the previous Bunny.net client: {e}")
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=BUNNY_MAX_CONNECTIONS,
+                    max_keepalive_connections=BUNNY_MAX_KEEPALIVE
+                ),
+                timeout=httpx.Timeout(BUNNY_API_TIMEOUT, connect=BUNNY_CONNECT_TIMEOUT),
+                transport=self.transport
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _endpoint_metrics(self, endpoint: str) -> EndpointMetrics:
+        if endpoint not in self._metrics:
+            self._metrics[endpoint] = EndpointMetrics()
+        return self._metrics[endpoint]
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": a random delay up to the exponential cap
+        return random.uniform(0, min(BUNNY_RETRY_MAX_DELAY, self.retry_base_delay * 2 ** attempt))
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        endpoint: str,
+        idempotent: bool = True,
+        retry: bool = True,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """Send a request; raises BunnyUnavailableError when Bunny is degraded
+        and httpx.HTTPStatusError for other error responses.
+
+        Pass retry=False for streamed bodies, which cannot be sent twice.
+        """
+        metrics = self._endpoint_metrics(endpoint)
+        trial = self.breaker.state == "half_open"
+        if not self.breaker.allow():
+            metrics.rejected += 1
+            raise BunnyUnavailableError("Bunny.net is temporarily unavailable")
+
+        try:
+            return await self._send(method, url, endpoint, metrics, idempotent, retry, timeout, **kwargs)
+        finally:
+            if trial:
+                # Also on errors that record nothing, such as cancellation
+                self.breaker.release_trial()
+
+    async def _send(self, method, url, endpoint, metrics, idempotent, retry, timeout, **kwargs) -> httpx.Response:
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=BUNNY_CONNECT_TIMEOUT)
+        client = await self._get_client()
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            error = None
+            try:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    error = httpx.HTTPStatusError(
+                        f"Bunny.net returned {response.status_code}",
+                        request=response.request,
+                        response=response
+                    )
+            except httpx.TransportError as e:
+                error = e
+            except Exception as e:
+                # Not retried (e.g. the streamed body failed to read, or a bad URL)
+                # but still a failed call as far as the breaker is concerned
+                metrics.record((time.perf_counter() - started) * 1000, True)
+                self.breaker.record_failure()
+                logger.error(f"Bunny.net {endpoint} failed: {e}")
+                raise
+            metrics.record((time.perf_counter() - started) * 1000, error is not None)
+
+            if error is None:
+                self.breaker.record_success()
+                response.raise_for_status()
+                return response
+
+            retryable = retry and (
+                idempotent or isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+            )
+            if not retryable or attempt >= self.max_retries or not self.breaker.allow():
+                self.breaker.record_failure()
+                logger.error(f"Bunny.net {endpoint} failed: {error}")
+                raise BunnyUnavailableError(f"Bunny.net {endpoint} failed: {error}") from error
+
+            delay = self._backoff(attempt)
+            attempt += 1
+            metrics.retries += 1
+            logger.warning(f"Retrying Bunny.net {endpoint} in {delay:.2f}s ({error})")
+            await asyncio.sleep(delay)
+
+    def metrics(self) -> dict:
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "endpoints": {name: m.as_dict() for name, m in self._metrics.items()}
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
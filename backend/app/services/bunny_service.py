@@ -1,58 +1,141 @@
 import os
-import requests
-from typing import Optional
-import json
+import time
+import asyncio
+import httpx
+from typing import Callable, Dict, Iterable, Optional
+from .bunny_client import BunnyClient, BunnyUnavailableError
+from ..utils.cache import TTLCache
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bytes read from the upload and sent to Bunny per chunk. Memory used by an
+# upload is bounded by this, whatever the size of the file.
+BUNNY_UPLOAD_CHUNK_SIZE = int(os.getenv('BUNNY_UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
+# Uploads allowed to stream at once per worker; later ones wait their turn so
+# large transfers cannot crowd out API traffic
+BUNNY_MAX_CONCURRENT_UPLOADS = int(os.getenv('BUNNY_MAX_CONCURRENT_UPLOADS', '2'))
+BUNNY_UPLOAD_TIMEOUT = float(os.getenv('BUNNY_UPLOAD_TIMEOUT', '120'))
+BUNNY_CREATE_TIMEOUT = float(os.getenv('BUNNY_CREATE_TIMEOUT', '10'))
+BUNNY_INFO_TIMEOUT = float(os.getenv('BUNNY_INFO_TIMEOUT', '5'))
+BUNNY_LIST_TIMEOUT = float(os.getenv('BUNNY_LIST_TIMEOUT', '15'))
+BUNNY_DELETE_TIMEOUT = float(os.getenv('BUNNY_DELETE_TIMEOUT', '10'))
+# Video metadata cache, keyed by Bunny guid
+BUNNY_INFO_CACHE_TTL = float(os.getenv('BUNNY_INFO_CACHE_TTL', '60'))
+BUNNY_INFO_CACHE_SIZE = int(os.getenv('BUNNY_INFO_CACHE_SIZE', '5000'))
+# Remote lookups a batch request runs at once
+BUNNY_INFO_BATCH_CONCURRENCY = int(os.getenv('BUNNY_INFO_BATCH_CONCURRENCY', '8'))
+
+# Lookup result for a video Bunny answered 404 for; never cached
+_NOT_FOUND = object()
 
 class BunnyService:
-    def __init__(self):
+    def __init__(self, client: Optional[BunnyClient] = None):
         self.api_key = os.getenv('BUNNY_API_KEY')
         self.library_id = os.getenv('BUNNY_LIBRARY_ID')
         self.base_url = os.getenv('BUNNY_BASE_URL')
         self.stream_url = os.getenv('BUNNY_STREAM_URL')
-        
+        self.chunk_size = BUNNY_UPLOAD_CHUNK_SIZE
+        self.client = client or BunnyClient()
+        self._upload_slots = None
+        self._info_cache = TTLCache(BUNNY_INFO_CACHE_SIZE, BUNNY_INFO_CACHE_TTL)
+        # guid -> task of the lookup in flight, shared by concurrent callers
+        self._info_inflight = {}
+
         self.headers = {
             "Accept": "application/json",
             "AccessKey": self.api_key
         }
 
-    async def upload_video(self, file, title: str) -> Optional[dict]:
-        """Upload a video to Bunny.net"""
+    def _get_upload_slots(self) -> asyncio.Semaphore:
+        # Created on first use so it belongs to the running event loop
+        if self._upload_slots is None:
+            self._upload_slots = asyncio.Semaphore(BUNNY_MAX_CONCURRENT_UPLOADS)
+        return self._upload_slots
+
+    async def _read_chunks(self, file, stats: dict, on_progress: Optional[Callable[[int], None]]):
+        """Yield the upload in chunk_size pieces, counting bytes as they go out"""
+        while True:
+            chunk = await file.read(self.chunk_size)
+            if not chunk:
+                break
+            stats["bytes"] += len(chunk)
+            if on_progress:
+                on_progress(stats["bytes"])
+            yield chunk
+
+    async def upload_video(
+        self,
+        file,
+        title: str,
+        on_progress: Optional[Callable[[int], None]] = None
+    ) -> Optional[dict]:
+        """Upload a video to Bunny.net
+
+        `file` is anything with an async read(size), such as an UploadFile.
+        The body is streamed to Bunny's raw PUT endpoint chunk by chunk, and
+        on_progress is called with the number of bytes sent so far.
+        Raises BunnyUnavailableError when Bunny.net is degraded.
+        """
         try:
-            # Create the video object
-            create_url = f"{self.base_url}/{self.library_id}/videos"
-            create_data = {
-                "title": title,
-                "collectionId": self.library_id
-            }
-            
-            response = requests.post(
-                create_url,
-                headers=self.headers,
-                json=create_data
-            )
-            response.raise_for_status()
-            video_data = response.json()
-            
-            # Upload the actual video file
-            upload_url = f"{self.base_url}/{self.library_id}/videos/{video_data['guid']}"
-            files = {
-                'video': (file.filename, file.file, 'video/mp4')
-            }
-            
-            response = requests.put(
-                upload_url,
-                headers={"AccessKey": self.api_key},
-                files=files
+            async with self._get_upload_slots():
+                # Create the video object
+                create_url = f"{self.base_url}/{self.library_id}/videos"
+                create_data = {
+                    "title": title,
+                    "collectionId": self.library_id
+                }
+
+                response = await self.client.request(
+                    "POST",
+                    create_url,
+                    endpoint="create_video",
+                    idempotent=False,
+                    timeout=BUNNY_CREATE_TIMEOUT,
+                    headers=self.headers,
+                    json=create_data
+                )
+                video_data = response.json()
+
+                # Stream the actual video file
+                upload_url = f"{self.base_url}/{self.library_id}/videos/{video_data['guid']}"
+                stats = {"bytes": 0}
+                started = time.perf_counter()
+                await self.client.request(
+                    "PUT",
+                    upload_url,
+                    endpoint="upload_video",
+                    retry=False,
+                    timeout=BUNNY_UPLOAD_TIMEOUT,
+                    headers={
+                        "AccessKey": self.api_key,
+                        "Content-Type": "application/octet-stream"
+                    },
+                    content=self._read_chunks(file, stats, on_progress)
+                )
+                elapsed = time.perf_counter() - started
+                self.invalidate_video_info(video_data['guid'])
+
+            bytes_per_second = stats["bytes"] / elapsed if elapsed > 0 else 0
+            logger.info(
+                f"Uploaded {stats['bytes']} bytes to Bunny.net in {elapsed:.1f}s "
+                f"({bytes_per_second / (1024 * 1024):.2f} MiB/s)"
             )
-            response.raise_for_status()
-            
+
             # Return the video URL
             return {
                 "video_id": video_data['guid'],
                 "url": f"{self.stream_url}/{self.library_id}/{video_data['guid']}/play",
-                "thumbnail": f"{self.stream_url}/{self.library_id}/{video_data['guid']}/thumbnail.jpg"
+                "thumbnail": f"{self.stream_url}/{self.library_id}/{video_data['guid']}/thumbnail.jpg",
+                "bytes": stats["bytes"],
+                "seconds": round(elapsed, 3),
+                "bytes_per_second": round(bytes_per_second)
             }
-            
+
+        except BunnyUnavailableError:
+            raise
         except Exception as e:
             print(f"Error uploading to Bunny.net: {str(e)}")
             return None
@@ -61,20 +144,118 @@ class BunnyService:
         """Delete a video from Bunny.net"""
         try:
             url = f"{self.base_url}/{self.library_id}/videos/{video_id}"
-            response = requests.delete(url, headers=self.headers)
-            response.raise_for_status()
+            await self.client.request(
+                "DELETE",
+                url,
+                endpoint="delete_video",
+                timeout=BUNNY_DELETE_TIMEOUT,
+                headers=self.headers
+            )
+            self.invalidate_video_info(video_id)
             return True
+        except BunnyUnavailableError:
+            raise
         except Exception as e:
             print(f"Error deleting from Bunny.net: {str(e)}")
             return False
 
+    def invalidate_video_info(self, video_id: str):
+        """Forget cached metadata, and any lookup in flight, for a video"""
+        self._info_cache.pop(video_id)
+        self._info_inflight.pop(video_id, None)
+
     async def get_video_info(self, video_id: str) -> Optional[dict]:
+        """Get video information, from the cache when fresh.
+
+        Concurrent misses for the same video share a single remote lookup.
+        """
+        info = await self._lookup_video_info(video_id)
+        return None if info is _NOT_FOUND else info
+
+    async def _lookup_video_info(self, video_id: str):
+        info = self._info_cache.get(video_id)
+        if info is not None:
+            return info
+
+        task = self._info_inflight.get(video_id)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_video_info(video_id))
+            self._info_inflight[video_id] = task
+
+            def on_done(done):
+                # Skip caching if the video was invalidated during the lookup
+                if self._info_inflight.get(video_id) is done:
+                    del self._info_inflight[video_id]
+                    if not done.cancelled() and done.exception() is None:
+                        info = done.result()
+                        if info is not None and info is not _NOT_FOUND:
+                            self._info_cache.set(video_id, info)
+
+            task.add_done_callback(on_done)
+
+        # Shielded so a caller that goes away does not cancel the shared lookup
+        return await asyncio.shield(task)
+
+    async def get_videos_info(self, video_ids: Iterable[str], missing: Optional[set] = None) -> Dict[str, Optional[dict]]:
+        """Look up many videos at once; cached ones cost no remote call.
+
+        Videos that Bunny reported as not found (404), as opposed to lookups
+        that failed, are added to `missing` when given.
+        """
+        video_ids = list(dict.fromkeys(video_ids))
+        slots = asyncio.Semaphore(BUNNY_INFO_BATCH_CONCURRENCY)
+
+        async def lookup(video_id):
+            async with slots:
+                return await self._lookup_video_info(video_id)
+
+        results = await asyncio.gather(*(lookup(video_id) for video_id in video_ids))
+        infos = {}
+        for video_id, info in zip(video_ids, results):
+            if info is _NOT_FOUND:
+                if missing is not None:
+                    missing.add(video_id)
+                info = None
+            infos[video_id] = info
+        return infos
+
+    async def _fetch_video_info(self, video_id: str) -> Optional[dict]:
         """Get video information from Bunny.net"""
         try:
             url = f"{self.base_url}/{self.library_id}/videos/{video_id}"
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
+            response = await self.client.request(
+                "GET",
+                url,
+                endpoint="get_video_info",
+                timeout=BUNNY_INFO_TIMEOUT,
+                headers=self.headers
+            )
             return response.json()
+        except BunnyUnavailableError:
+            raise
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return _NOT_FOUND
+            print(f"Error getting video info from Bunny.net: {str(e)}")
+            return None
         except Exception as e:
             print(f"Error getting video info from Bunny.net: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    async def list_videos(self, page: int = 1, items_per_page: int = 100, order_by: str = "date") -> dict:
+        """One page of the library listing, newest first when ordered by date"""
+        url = f"{self.base_url}/{self.library_id}/videos"
+        response = await self.client.request(
+            "GET",
+            url,
+            endpoint="list_videos",
+            timeout=BUNNY_LIST_TIMEOUT,
+            headers=self.headers,
+            params={"page": page, "itemsPerPage": items_per_page, "orderBy": order_by}
+        )
+        return response.json()
+
+    async def close(self):
+        await self.client.close()
+
+bunny_service = BunnyService()
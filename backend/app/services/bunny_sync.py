@@ -0,0 +1,270 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo import UpdateMany, UpdateOne
+from .bunny_service import BunnyService, bunny_service
+from ..repositories.videos import videos_repo
+from ..repositories.catalog_versions import catalog_versions_repo, VIDEOS
+from .album_stats import reconcile as reconcile_album_stats
+from ..utils.db import get_async_db
+from ..utils.updates import changed_pipeline
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUNNY_SYNC_PAGE_SIZE = int(os.getenv("BUNNY_SYNC_PAGE_SIZE", "100"))
+# Incremental runs re-read this much of the listing before the last cursor,
+# so uploads sharing a timestamp or arriving out of order are not missed
+BUNNY_SYNC_OVERLAP_SECONDS = float(os.getenv("BUNNY_SYNC_OVERLAP_SECONDS", "300"))
+
+# Bunny encoding statuses that will not change any more (finished, error,
+# upload failed); videos in any other state are re-checked on every run
+FINAL_ENCODING_STATUSES = [4, 5, 6]
+
+SYNC_STATE_ID = "bunny_library"
+
+def parse_bunny_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    value = value.rstrip("Z")
+    if "." in value:
+        # Bunny sends up to 7 fractional digits; datetime accepts 6
+        head, fraction = value.split(".", 1)
+        value = f"{head}.{fraction[:6]}"
+    return datetime.fromisoformat(value)
+
+def metadata_fields(item: dict) -> dict:
+    """Video document fields taken from a Bunny video object"""
+    return {
+        "encoding_status": item.get("status"),
+        "encode_progress": item.get("encodeProgress"),
+        "duration": item.get("length"),
+        "width": item.get("width"),
+        "height": item.get("height"),
+        "size_bytes": item.get("storageSize"),
+        "bunny_uploaded_at": parse_bunny_date(item.get("dateUploaded"))
+    }
+
+class BunnyLibrarySync:
+    """Copies Bunny.net video metadata into the videos collection.
+
+    Pages through the library listing newest first and writes the metadata
+    of every matching video (by video_id) with one unordered bulk_write per
+    page. Incremental runs stop at the upload date reached by the previous
+    run and additionally refresh videos whose encoding had not finished;
+    a refreshed video Bunny answers 404 for gets bunny_missing_at and is not
+    looked up again until the listing shows it. A full run also flags videos
+    whose Bunny video no longer exists.
+    Videos in Bunny but not in the portal are recorded in bunny_orphans.
+    """
+
+    def __init__(self, bunny: BunnyService):
+        self.bunny = bunny
+        self._lock = None
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        if self._task is not None and not self._task.done():
+            return True
+        return self._lock is not None and self._lock.locked()
+
+    async def run(self, full: bool = False) -> dict:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            return await self._run(full)
+
+    def start(self, full: bool = False) -> Optional[asyncio.Task]:
+        """Run a sync in the background, logging rather than raising failures.
+
+        Returns None without starting anything if a sync is already running;
+        the check and the start happen without yielding to the loop, so two
+        concurrent requests cannot both start one.
+        """
+        if self.running:
+            return None
+
+        async def run_logged():
+            try:
+                return await self.run(full)
+            except Exception as e:
+                logger.error(f"Bunny library sync failed: {e}")
+
+        self._task = asyncio.ensure_future(run_logged())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, full: bool) -> dict:
+        db = get_async_db()
+        started = datetime.utcnow()
+        run_id = uuid.uuid4().hex
+        state = await db.sync_state.find_one({"_id": SYNC_STATE_ID}) or {}
+        cursor = None if full else state.get("last_uploaded_at")
+        stop_at = cursor - timedelta(seconds=BUNNY_SYNC_OVERLAP_SECONDS) if cursor else None
+
+        stats = {"pages": 0, "listed": 0, "matched": 0, "modified": 0, "bunny_orphans": 0,
+                 "portal_orphans": 0, "refreshed": 0}
+        # Albums whose videos' durations may have changed
+        touched_albums = set()
+        newest = cursor
+        page = 1
+        while True:
+            listing = await self.bunny.list_videos(page, BUNNY_SYNC_PAGE_SIZE)
+            items = listing.get("items") or []
+            stats["pages"] += 1
+
+            fresh = []
+            for item in items:
+                uploaded = parse_bunny_date(item.get("dateUploaded"))
+                if stop_at and uploaded and uploaded < stop_at:
+                    break
+                fresh.append(item)
+                if uploaded and (newest is None or uploaded > newest):
+                    newest = uploaded
+            stats["listed"] += len(fresh)
+            await self._apply_page(db, fresh, run_id, stats, touched_albums)
+
+            if len(fresh) < len(items) or len(items) < BUNNY_SYNC_PAGE_SIZE:
+                break
+            page += 1
+
+        if full:
+            # Anything with a Bunny guid that this run did not see is gone from Bunny
+            result = await videos_repo.collection.update_many(
+                {
+                    "video_id": {"$exists": True, "$ne": None},
+                    "bunny_sync_run": {"$ne": run_id},
+                    "bunny_orphan": {"$ne": True}
+                },
+                {"$set": {"bunny_orphan": True, "updated_at": started}}
+            )
+            stats["portal_orphans"] = result.modified_count
+            await catalog_versions_repo.bump(VIDEOS)
+        else:
+            stats["refreshed"] = await self._refresh_unfinished(run_id, touched_albums)
+
+        stats["albums_reconciled"] = await reconcile_album_stats(touched_albums) if touched_albums else 0
+
+        update = {"last_run_at": started, "last_uploaded_at": newest}
+        if full:
+            update["last_full_run_at"] = started
+        await db.sync_state.update_one({"_id": SYNC_STATE_ID}, {"$set": update}, upsert=True)
+
+        stats["seconds"] = round((datetime.utcnow() - started).total_seconds(), 2)
+        logger.info(f"Bunny library sync ({'full' if full else 'incremental'}): {stats}")
+        return stats
+
+    async def _apply_page(self, db, items: list, run_id: str, stats: dict, touched_albums: set):
+        if not items:
+            return
+        guids = [item["guid"] for item in items]
+        known = await videos_repo.collection.distinct("video_id", {"video_id": {"$in": guids}})
+        known = set(known)
+        now = datetime.utcnow()
+
+        operations = [
+            UpdateMany(
+                {"video_id": item["guid"]},
+                changed_pipeline(
+                    dict(metadata_fields(item), bunny_orphan=False),
+                    now,
+                    always={"bunny_synced_at": now, "bunny_sync_run": run_id}
+                )
+            )
+            for item in items if item["guid"] in known
+        ]
+        if known:
+            # Listed again, so no longer missing
+            operations.append(UpdateMany(
+                {"video_id": {"$in": list(known)}, "bunny_missing_at": {"$ne": None}},
+                {"$unset": {"bunny_missing_at": ""}, "$set": {"updated_at": now}}
+            ))
+        if operations:
+            result = await videos_repo.bulk_write(operations)
+            stats["matched"] += result.matched_count
+            stats["modified"] += result.modified_count
+            if result.modified_count:
+                touched_albums.update(await self._albums_of(known))
+
+        orphans = [item for item in items if item["guid"] not in known]
+        orphan_ops = [
+            UpdateOne(
+                {"_id": item["guid"]},
+                {"$set": {
+                    "title": item.get("title"),
+                    "uploaded_at": parse_bunny_date(item.get("dateUploaded")),
+                    "seen_at": now,
+                    "resolved": False
+                }},
+                upsert=True
+            )
+            for item in orphans
+        ]
+        if known:
+            orphan_ops.append(UpdateMany({"_id": {"$in": list(known)}}, {"$set": {"resolved": True}}))
+        if orphan_ops:
+            await db.bunny_orphans.bulk_write(orphan_ops, ordered=False)
+        stats["bunny_orphans"] += len(orphans)
+
+    async def _albums_of(self, guids) -> list:
+        return await videos_repo.collection.distinct(
+            "album_id",
+            {"video_id": {"$in": list(guids)}, "album_id": {"$ne": None}}
+        )
+
+    async def _refresh_unfinished(self, run_id: str, touched_albums: set) -> int:
+        """Re-read videos that were still encoding at the last sync"""
+        videos = await videos_repo.collection.find(
+            {
+                "video_id": {"$exists": True, "$ne": None},
+                "encoding_status": {"$nin": FINAL_ENCODING_STATUSES},
+                "bunny_orphan": {"$ne": True},
+                "bunny_missing_at": None
+            },
+            {"video_id": 1}
+        ).to_list(length=None)
+        guids = list({video["video_id"] for video in videos})
+        if not guids:
+            return 0
+
+        for guid in guids:
+            # Encoding state changes often; skip the metadata cache
+            self.bunny.invalidate_video_info(guid)
+        missing = set()
+        infos = await self.bunny.get_videos_info(guids, missing=missing)
+        now = datetime.utcnow()
+        if missing:
+            result = await videos_repo.collection.update_many(
+                {"video_id": {"$in": list(missing)}},
+                {"$set": {"bunny_missing_at": now, "updated_at": now}}
+            )
+            if result.modified_count:
+                logger.info(f"Bunny sync: {len(missing)} videos no longer found in Bunny")
+                await catalog_versions_repo.bump(VIDEOS)
+        operations = [
+            UpdateMany(
+                {"video_id": guid},
+                changed_pipeline(
+                    metadata_fields(info),
+                    now,
+                    always={"bunny_synced_at": now, "bunny_sync_run": run_id}
+                )
+            )
+            for guid, info in infos.items() if info
+        ]
+        if operations:
+            await videos_repo.bulk_write(operations)
+            touched_albums.update(await self._albums_of(guid for guid, info in infos.items() if info))
+        return len(operations)
+
+bunny_sync = BunnyLibrarySync(bunny_service)
@@ -0,0 +1,65 @@
+import os
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional
+from pymongo import ASCENDING
+from ..utils.db import get_async_db
+from ..utils.responses import dumps
+
+# Documents fetched from Mongo per round trip, and bytes gathered before a
+# chunk is sent; together they bound the memory an export uses
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+EXPORT_COLLECTIONS = ("albums", "videos")
+
+async def export_ndjson(
+    collections: Iterable[str],
+    fields: Optional[List[str]] = None,
+    since: Optional[datetime] = None,
+    tag_collection: bool = False
+) -> AsyncIterator[bytes]:
+    """Stream documents as NDJSON chunks straight from Mongo cursors.
+
+    With `since`, only documents updated at or after it are exported, oldest
+    change first, so a client can continue from the last updated_at it saw.
+    """
+    projection = {field: 1 for field in fields} if fields else None
+    buffer = bytearray()
+    for name in collections:
+        query = {"updated_at": {"$gte": since}} if since else {}
+        cursor = get_async_db()[name].find(query, projection, batch_size=EXPORT_BATCH_SIZE)
+        if since:
+            cursor = cursor.sort([("updated_at", ASCENDING), ("_id", ASCENDING)])
+        async for doc in cursor:
+            if tag_collection:
+                doc["_collection"] = name
+            buffer += dumps(doc)
+            buffer += b"\n"
+            if len(buffer) >= EXPORT_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+async def backfill_updated_at(collections: Iterable[str] = EXPORT_COLLECTIONS) -> dict:
+    """Give documents written before updated_at was kept one, so `since` exports see them.
+
+    Uses created_at when present, otherwise the creation time in the _id.
+    """
+    counts = {}
+    for name in collections:
+        result = await get_async_db()[name].update_many(
+            {"updated_at": {"$exists": False}},
+            [{"$set": {"updated_at": {"$ifNull": ["$created_at", {"$toDate": "$_id"}]}}}]
+        )
+        counts[name] = result.modified_count
+    return counts
@@ -0,0 +1,227 @@
+import os
+import csv
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from ..models.video import AlbumCreate, VideoCreate
+from ..repositories.albums import albums_repo
+from ..repositories.videos import videos_repo
+from .album_stats import reconcile
+from ..utils.updates import changed_pipeline
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_CREATED_BY = "import"
+
+class RowError(ValueError):
+    pass
+
+def read_manifest(path: str, file_format: Optional[str] = None) -> Iterator[Tuple[int, dict]]:
+    """Yield (line number, row) from a JSONL or CSV manifest without loading it whole"""
+    file_format = file_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="", encoding="utf-8") as manifest:
+        if file_format == "csv":
+            reader = csv.DictReader(manifest)
+            for row in reader:
+                # Empty CSV cells mean "not set"
+                yield reader.line_num, {key: value for key, value in row.items() if value not in ("", None)}
+        else:
+            for line_number, line in enumerate(manifest, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError as e:
+                        yield line_number, {"_error": f"invalid JSON: {e}"}
+
+def album_operation(row: dict, now: datetime) -> UpdateOne:
+    album = AlbumCreate(**row)
+    return UpdateOne(
+        {"import_key": row["key"]},
+        changed_pipeline(album.dict(), now, on_insert={
+            "id": str(ObjectId()),
+            "created_by": IMPORT_CREATED_BY,
+            "created_at": now,
+            "video_count": 0,
+            "is_active": True
+        }),
+        upsert=True
+    )
+
+def video_operation(row: dict, album_id: Optional[str], now: datetime) -> UpdateOne:
+    video = VideoCreate(**dict(row, album_id=album_id))
+    fields = video.dict()
+    for optional in ("thumbnail_url", "video_id"):
+        if row.get(optional):
+            fields[optional] = row[optional]
+    if row.get("duration"):
+        fields["duration"] = float(row["duration"])
+    return UpdateOne(
+        {"import_key": row["key"]},
+        changed_pipeline(fields, now, on_insert={
+            "id": str(ObjectId()),
+            "share_token": str(uuid.uuid4()),
+            "created_by": IMPORT_CREATED_BY,
+            "created_at": now
+        }),
+        upsert=True
+    )
+
+class Checkpoint:
+    """Last fully written manifest line, and albums touched so far, kept in a JSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.line = 0
+        self.albums = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.line = state["line"]
+            self.albums = set(state["albums"])
+
+    def save(self, line: int):
+        self.line = line
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"line": line, "albums": sorted(self.albums)}, f)
+        # Atomic replace, so a crash never leaves a half-written checkpoint
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class CatalogImporter:
+    """Loads albums and videos from a manifest with idempotent upserts.
+
+    Each row has a `type` ("album" or "video") and a natural `key`; videos
+    name their album by its key in `album`. Rows are validated with the API
+    models and written in batches of unordered bulk_write upserts keyed on
+    import_key, so re-running a manifest updates rather than duplicates.
+    After each batch the checkpoint records the last line written; a rerun
+    resumes from there. Album stats are reconciled once at the end.
+    """
+
+    def __init__(self, path: str, file_format: Optional[str] = None,
+                 batch_size: int = IMPORT_BATCH_SIZE, checkpoint_path: Optional[str] = None):
+        self.path = path
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.checkpoint = Checkpoint(checkpoint_path or f"{path}.checkpoint")
+        # album key -> public album id, filled as albums are written
+        self.album_ids = {}
+        self.stats = {"rows": 0, "skipped": 0, "albums": 0, "videos": 0, "inserted": 0,
+                      "updated": 0, "invalid": 0, "albums_reconciled": 0}
+        self.errors = []
+
+    async def run(self, progress=None) -> dict:
+        started = time.perf_counter()
+        batch = []
+        last_line = self.checkpoint.line
+        if last_line:
+            logger.info(f"Resuming {self.path} after line {last_line}")
+
+        for line_number, row in read_manifest(self.path, self.file_format):
+            if line_number <= self.checkpoint.line:
+                self.stats["skipped"] += 1
+                continue
+            batch.append((line_number, row))
+            last_line = line_number
+            if len(batch) >= self.batch_size:
+                await self._write_batch(batch, last_line)
+                batch = []
+                if progress:
+                    progress(self.report(started))
+        if batch:
+            await self._write_batch(batch, last_line)
+
+        self.stats["albums_reconciled"] = await reconcile(self.checkpoint.albums)
+        self.checkpoint.remove()
+        return self.report(started)
+
+    def report(self, started: float) -> dict:
+        seconds = time.perf_counter() - started
+        return dict(
+            self.stats,
+            seconds=round(seconds, 2),
+            rows_per_second=round(self.stats["rows"] / seconds, 1) if seconds > 0 else 0.0
+        )
+
+    def _invalid(self, line_number: int, error):
+        self.stats["invalid"] += 1
+        if len(self.errors) < 100:
+            self.errors.append((line_number, str(error)))
+
+    async def _write_batch(self, batch: list, last_line: int):
+        now = datetime.utcnow()
+        album_rows = [(n, row) for n, row in batch if row.get("type") == "album"]
+        video_rows = [(n, row) for n, row in batch if row.get("type") == "video"]
+        for line_number, row in batch:
+            if row.get("type") not in ("album", "video"):
+                self._invalid(line_number, row.get("_error") or "type must be album or video")
+        self.stats["rows"] += len(batch)
+
+        # Albums first, so videos of this batch can reference them
+        # Keyed by natural id: a key repeated within a batch keeps its last row,
+        # as two concurrent upserts of one key would collide on the unique index
+        operations = {}
+        for line_number, row in album_rows:
+            try:
+                if not row.get("key"):
+                    raise RowError("key is required")
+                operations[row["key"]] = album_operation(row, now)
+            except (ValidationError, RowError) as e:
+                self._invalid(line_number, e)
+        if operations:
+            result = await albums_repo.bulk_write(list(operations.values()))
+            self._count(result, "albums", len(operations))
+            await self._load_album_ids(operations)
+
+        await self._load_album_ids({row["album"] for _, row in video_rows if row.get("album")})
+        operations = {}
+        for line_number, row in video_rows:
+            try:
+                if not row.get("key"):
+                    raise RowError("key is required")
+                album_id = None
+                if row.get("album"):
+                    album_id = self.album_ids.get(row["album"])
+                    if album_id is None:
+                        raise RowError(f"unknown album {row['album']!r}")
+                operations[row["key"]] = video_operation(row, album_id, now)
+                if album_id:
+                    self.checkpoint.albums.add(album_id)
+            except (ValidationError, RowError, ValueError) as e:
+                self._invalid(line_number, e)
+        if operations:
+            # A video moving to another album changes the stats of both
+            async for video in videos_repo.collection.find(
+                {"import_key": {"$in": list(operations)}, "album_id": {"$ne": None}}, {"album_id": 1}
+            ):
+                self.checkpoint.albums.add(video["album_id"])
+            result = await videos_repo.bulk_write(list(operations.values()))
+            self._count(result, "videos", len(operations))
+
+        self.checkpoint.save(last_line)
+
+    def _count(self, result, kind: str, rows: int):
+        self.stats[kind] += rows
+        self.stats["inserted"] += result.upserted_count
+        self.stats["updated"] += result.modified_count
+
+    async def _load_album_ids(self, keys):
+        missing = [key for key in keys if key not in self.album_ids]
+        if missing:
+            async for album in albums_repo.collection.find(
+                {"import_key": {"$in": missing}}, {"id": 1, "import_key": 1}
+            ):
+                self.album_ids[album["import_key"]] = album.get("id") or str(album["_id"])
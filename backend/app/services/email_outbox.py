@@ -0,0 +1,122 @@
+import os
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from ..repositories.email_outbox import email_outbox_repo
+from ..utils.email import SMTPSender
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "5"))
+# Upper bound on messages handed to the SMTP server per second
+EMAIL_RATE_PER_SECOND = float(os.getenv("EMAIL_RATE_PER_SECOND", "5"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+# Lease on claimed messages; claims older than this are put back in the queue
+# by the next poll of any worker
+EMAIL_STALE_SECONDS = float(os.getenv("EMAIL_STALE_SECONDS", "600"))
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff after the given number of failed attempts"""
+    return min(EMAIL_RETRY_MAX_SECONDS, EMAIL_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+
+class EmailOutboxWorker:
+    """Delivers queued emails from the email_outbox collection.
+
+    A single background task claims due messages in batches and sends them
+    over one reused SMTP connection on a dedicated thread, so smtplib never
+    blocks the event loop. Sends are spaced to EMAIL_RATE_PER_SECOND; failed
+    messages are retried with exponential backoff up to EMAIL_MAX_ATTEMPTS.
+    The connection is closed whenever the queue runs dry. Every poll also
+    requeues claims whose EMAIL_STALE_SECONDS lease has expired.
+    """
+
+    def __init__(self, sender: SMTPSender = None):
+        self.sender = sender or SMTPSender()
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+        self._task = None
+        self._wakeup = None
+        self._last_reclaim = None
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        await self.reclaim_stale()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await email_outbox_repo.release(self.name)
+        await self._call(self.sender.close)
+
+    def notify(self):
+        """Wake the worker after queueing messages"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def reclaim_stale(self) -> int:
+        """Requeue messages whose claim lease expired"""
+        self._last_reclaim = datetime.utcnow()
+        requeued = await email_outbox_repo.requeue_stale(EMAIL_STALE_SECONDS)
+        if requeued:
+            logger.info(f"Requeued {requeued} stale outbox emails")
+        return requeued
+
+    async def _call(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _run(self):
+        while True:
+            try:
+                if datetime.utcnow() - self._last_reclaim >= timedelta(seconds=EMAIL_POLL_SECONDS):
+                    await self.reclaim_stale()
+                sent = await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email worker failed to process a batch: {e}")
+                sent = 0
+
+            if sent == 0:
+                await self._call(self.sender.close)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), EMAIL_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def process_batch(self) -> int:
+        """Send one batch of due messages; returns how many were attempted"""
+        messages = await email_outbox_repo.claim_batch(self.name, EMAIL_BATCH_SIZE)
+        interval = 1 / EMAIL_RATE_PER_SECOND if EMAIL_RATE_PER_SECOND > 0 else 0
+        loop = asyncio.get_event_loop()
+        for message in messages:
+            started = loop.time()
+            try:
+                await self._call(self.sender.send, message)
+                await email_outbox_repo.mark_sent(message["_id"])
+            except Exception as e:
+                # The session may be unusable after an error; start a fresh one
+                await self._call(self.sender.close)
+                attempts = message.get("attempts", 0) + 1
+                retry_at = None
+                if attempts < EMAIL_MAX_ATTEMPTS:
+                    retry_at = datetime.utcnow() + timedelta(seconds=retry_delay(attempts))
+                logger.warning(f"Email to {message['to']} failed (attempt {attempts}): {e}")
+                await email_outbox_repo.mark_failed(message["_id"], str(e), retry_at)
+            wait = interval - (loop.time() - started)
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return len(messages)
+
+email_worker = EmailOutboxWorker()
@@ -0,0 +1,110 @@
+import os
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+from ..repositories.playback_progress import playback_progress_repo
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROGRESS_FLUSH_SECONDS = float(os.getenv("PROGRESS_FLUSH_SECONDS", "10"))
+# Flush early once this many (user, video) positions are waiting
+PROGRESS_MAX_PENDING = int(os.getenv("PROGRESS_MAX_PENDING", "5000"))
+# Share of the duration after which a video counts as watched
+PROGRESS_COMPLETED_RATIO = 0.95
+
+class ProgressBuffer:
+    """Write-behind buffer for playback heartbeats.
+
+    Heartbeats only replace the pending entry of their (user, video) in
+    memory; a background task writes whatever is pending every
+    PROGRESS_FLUSH_SECONDS with one unordered bulk_write, and stop() writes
+    the rest. A crash loses at most one interval of positions.
+    """
+
+    def __init__(self):
+        # (user_id, video_id) -> latest entry not yet written
+        self._pending: Dict[tuple, dict] = {}
+        self._task = None
+        self._wakeup = None
+        self._flush_lock = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, user_id: str, video_id: str, album_id: Optional[str],
+               position: float, duration: Optional[float] = None) -> dict:
+        completed = bool(duration) and position >= duration * PROGRESS_COMPLETED_RATIO
+        entry = {
+            "user_id": user_id,
+            "video_id": video_id,
+            "album_id": album_id,
+            "position": position,
+            "duration": duration,
+            "completed": completed,
+            "reported_at": datetime.utcnow()
+        }
+        self._pending[(user_id, video_id)] = entry
+        if len(self._pending) >= PROGRESS_MAX_PENDING and self._wakeup is not None:
+            self._wakeup.set()
+        return entry
+
+    def pending_for_album(self, user_id: str, album_id: str) -> Dict[str, dict]:
+        """Unwritten entries of a user in an album, by video id"""
+        return {
+            entry["video_id"]: entry
+            for (entry_user, _), entry in self._pending.items()
+            if entry_user == user_id and entry["album_id"] == album_id
+        }
+
+    async def flush(self) -> int:
+        """Write every pending entry; returns how many were written"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            entries, self._pending = self._pending, {}
+            try:
+                await playback_progress_repo.save_many(list(entries.values()))
+            except BaseException:
+                # Put back what no newer heartbeat has replaced meanwhile, also
+                # when cancelled at shutdown so stop() still writes them
+                for key, entry in entries.items():
+                    self._pending.setdefault(key, entry)
+                raise
+            return len(entries)
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            written = await self.flush()
+            if written:
+                logger.info(f"Flushed {written} playback positions on shutdown")
+        except Exception as e:
+            logger.error(f"Could not flush {len(self)} playback positions on shutdown: {e}")
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), PROGRESS_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Playback progress flush failed, {len(self)} positions kept: {e}")
+
+progress_buffer = ProgressBuffer()
@@ -0,0 +1,172 @@
+import os
+import re
+import asyncio
+from bisect import bisect_left, insort
+from typing import List, Optional
+from ..repositories.albums import albums_repo, public_album_id
+from ..repositories.videos import videos_repo
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rebuild from Mongo this often, to pick up writes made by other processes
+# (imports, Bunny syncs, other workers); 0 disables the refresh
+TITLE_INDEX_REFRESH_SECONDS = float(os.getenv("TITLE_INDEX_REFRESH_SECONDS", "600"))
+MAX_SUGGESTIONS = 50
+
+ALBUM = "album"
+VIDEO = "video"
+
+_WORD = re.compile(r"\w+")
+
+def normalize(text: Optional[str]) -> List[str]:
+    return _WORD.findall((text or "").lower())
+
+def title_keys(title: Optional[str]) -> List[str]:
+    """Index keys of a title: the title from each of its words onwards.
+
+    "Bhagavad Gita chapter 2" is found by "bhag", "gita ch" and "chap".
+    """
+    words = normalize(title)
+    return [" ".join(words[start:]) for start in range(len(words))]
+
+def build_entries(items):
+    """Titles by (kind, id) and the sorted entries of a full set of (kind, id, title)"""
+    titles = {(kind, item_id): title or "" for kind, item_id, title in items}
+    entries = sorted(
+        (key, kind, item_id)
+        for (kind, item_id), title in titles.items()
+        for key in title_keys(title)
+    )
+    return titles, entries
+
+class TitleIndex:
+    """Prefix index over album and video titles, held in process memory.
+
+    A sorted list of (key, kind, id) searched with bisect, so a lookup is a
+    binary search plus a short scan and never touches Mongo. Built at
+    startup, kept current by the write paths of this process, and rebuilt
+    every TITLE_INDEX_REFRESH_SECONDS. Used from the event loop only; a
+    rebuild sorts in an executor and replays the writes made meanwhile.
+    Like the catalog endpoints, it leaves out inactive albums and the videos
+    in them.
+    """
+
+    def __init__(self):
+        self._entries = []
+        # (kind, id) -> title
+        self._titles = {}
+        # Ids (either form) of active albums, whose videos may be suggested
+        self._active_albums = set()
+        # Writes made while a rebuild is reading Mongo, replayed after the swap
+        self._journal = None
+        self._task = None
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def add(self, kind: str, item_id: str, title: Optional[str]):
+        """Index a new title, or replace the indexed title of an item"""
+        if self._journal is not None:
+            self._journal.append((self.add, kind, item_id, title))
+        self._remove(kind, item_id)
+        if kind == ALBUM:
+            self._active_albums.add(item_id)
+        self._titles[(kind, item_id)] = title or ""
+        for key in title_keys(title):
+            insort(self._entries, (key, kind, item_id))
+
+    def remove(self, kind: str, item_id: str):
+        if self._journal is not None:
+            self._journal.append((self.remove, kind, item_id))
+        if kind == ALBUM:
+            self._active_albums.discard(item_id)
+        self._remove(kind, item_id)
+
+    def _remove(self, kind: str, item_id: str):
+        title = self._titles.pop((kind, item_id), None)
+        if title is None:
+            return
+        for key in title_keys(title):
+            index = bisect_left(self._entries, (key, kind, item_id))
+            if index < len(self._entries) and self._entries[index] == (key, kind, item_id):
+                del self._entries[index]
+
+    def add_videos(self, videos: List[dict]):
+        for video in videos:
+            if video.get("album_id") and video["album_id"] not in self._active_albums:
+                continue
+            self.add(VIDEO, video.get("id") or str(video["_id"]), video.get("title"))
+
+    def replace_all(self, items):
+        """Swap in a full set of (kind, id, title) at once"""
+        items = list(items)
+        self._titles, self._entries = build_entries(items)
+        self._active_albums = {item_id for kind, item_id, _ in items if kind == ALBUM}
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        """Titles with a word sequence starting with prefix, alphabetical by match"""
+        prefix = " ".join(normalize(prefix))
+        if not prefix:
+            return []
+        suggestions = []
+        seen = set()
+        index = bisect_left(self._entries, (prefix,))
+        while index < len(self._entries) and len(suggestions) < limit:
+            key, kind, item_id = self._entries[index]
+            if not key.startswith(prefix):
+                break
+            if (kind, item_id) not in seen:
+                seen.add((kind, item_id))
+                suggestions.append({"type": kind, "id": item_id, "title": self._titles[(kind, item_id)]})
+            index += 1
+        return suggestions
+
+    async def load(self) -> int:
+        """Rebuild from the albums and videos collections; returns the titles indexed"""
+        journal = self._journal = []
+        try:
+            items = []
+            active_albums = set()
+            async for album in albums_repo.collection.find({"is_active": True}, {"id": 1, "title": 1}):
+                items.append((ALBUM, public_album_id(album), album.get("title")))
+                # Videos reference their album by either id
+                active_albums.update(filter(None, (album.get("id"), str(album["_id"]))))
+            async for video in videos_repo.collection.find({}, {"id": 1, "title": 1, "album_id": 1}):
+                if video.get("album_id") and video["album_id"] not in active_albums:
+                    continue
+                items.append((VIDEO, video.get("id") or str(video["_id"]), video.get("title")))
+            loop = asyncio.get_event_loop()
+            titles, entries = await loop.run_in_executor(None, build_entries, items)
+        finally:
+            self._journal = None
+        # The snapshot may predate writes made while it was read and sorted
+        self._titles, self._entries = titles, entries
+        self._active_albums = active_albums
+        for write, *args in journal:
+            write(*args)
+        return len(self)
+
+    async def start(self):
+        count = await self.load()
+        logger.info(f"Title index built with {count} titles")
+        if TITLE_INDEX_REFRESH_SECONDS > 0:
+            self._task = asyncio.ensure_future(self._refresh())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh(self):
+        while True:
+            await asyncio.sleep(TITLE_INDEX_REFRESH_SECONDS)
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Title index refresh failed: {e}")
+
+title_index = TitleIndex()
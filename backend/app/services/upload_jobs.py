@@ -0,0 +1,330 @@
+import os
+import json
+import uuid
+import socket
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException, UploadFile, status
+from .bunny_service import BunnyService, bunny_service, BUNNY_UPLOAD_CHUNK_SIZE
+from ..repositories.upload_jobs import upload_jobs_repo
+from ..repositories.videos import videos_repo
+from .album_stats import add_video
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Uploads are staged on local disk, so jobs are only picked up by workers on
+# the host that staged them, unless that host stops handling them (below)
+UPLOAD_STAGING_DIR = os.getenv(
+    "UPLOAD_STAGING_DIR",
+    os.path.join(tempfile.gettempdir(), "video_portal_uploads")
+)
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+# New uploads are refused with 503 once this many jobs wait on this host
+UPLOAD_MAX_QUEUED = int(os.getenv("UPLOAD_MAX_QUEUED", "20"))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "3"))
+# A failed or abandoned attempt is retried after this many seconds, doubling
+# with every further attempt
+UPLOAD_RETRY_BASE_SECONDS = float(os.getenv("UPLOAD_RETRY_BASE_SECONDS", "30"))
+UPLOAD_POLL_SECONDS = float(os.getenv("UPLOAD_POLL_SECONDS", "5"))
+# How often progress is written to Mongo while a job runs; it also serves as
+# the heartbeat used to detect jobs abandoned by a crashed worker
+UPLOAD_PROGRESS_INTERVAL = float(os.getenv("UPLOAD_PROGRESS_INTERVAL", "1"))
+UPLOAD_STALE_SECONDS = float(os.getenv("UPLOAD_STALE_SECONDS", "300"))
+# How often a worker looks for stale and orphaned jobs
+UPLOAD_SWEEP_SECONDS = float(os.getenv("UPLOAD_SWEEP_SECONDS", "60"))
+# Queued jobs of another host untouched this long are taken over when their
+# staged file is reachable here (shared staging dir), failed otherwise; that
+# host is assumed gone, e.g. replaced by a deploy under a new hostname
+UPLOAD_ORPHAN_SECONDS = float(os.getenv("UPLOAD_ORPHAN_SECONDS", "3600"))
+UPLOAD_EVENTS_INTERVAL = float(os.getenv("UPLOAD_EVENTS_INTERVAL", "1"))
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+class StagedFile:
+    """Async reader over a staged upload, matching UploadFile.read()"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+
+    async def read(self, size: int = -1) -> bytes:
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._file.read, size)
+
+    def close(self):
+        self._file.close()
+
+def serialize_job(job: dict) -> dict:
+    return {
+        "id": str(job["_id"]),
+        "status": job["status"],
+        "title": job.get("title"),
+        "album_id": job.get("album_id"),
+        "filename": job.get("filename"),
+        "size": job.get("size", 0),
+        "bytes_uploaded": job.get("bytes_uploaded", 0),
+        "progress": job.get("progress", 0.0),
+        "bytes_per_second": job.get("bytes_per_second"),
+        "attempts": job.get("attempts", 0),
+        "retry_after": job.get("retry_after").isoformat() if job.get("retry_after") else None,
+        "video_id": job.get("video_id"),
+        "error": job.get("error"),
+        "created_at": job.get("created_at").isoformat() if job.get("created_at") else None,
+        "updated_at": job.get("updated_at").isoformat() if job.get("updated_at") else None
+    }
+
+class UploadJobManager:
+    """Runs Bunny uploads in the background.
+
+    The upload endpoint stages the file to disk and records a queued job in
+    the upload_jobs collection. A fixed pool of worker tasks claims queued
+    jobs atomically, streams the staged file to Bunny, then writes the video
+    document and bumps the album's video count. The Bunny guid is saved on
+    the job as soon as the upload succeeds and the video document takes the
+    job id as its id, so a retry never uploads or inserts the video twice.
+    """
+
+    def __init__(self, bunny: BunnyService):
+        self.bunny = bunny
+        self.host = socket.gethostname()
+        self._workers = []
+        self._wakeup = None
+        self._last_sweep = None
+        # Jobs running in this process, kept current for progress events
+        self._active = {}
+
+    async def start(self):
+        os.makedirs(UPLOAD_STAGING_DIR, exist_ok=True)
+        self._wakeup = asyncio.Event()
+        await self.sweep()
+        self._workers = [
+            asyncio.ensure_future(self._worker(f"{self.host}:{os.getpid()}:{i}"))
+            for i in range(UPLOAD_WORKERS)
+        ]
+        logger.info(f"Started {UPLOAD_WORKERS} upload workers")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def sweep(self):
+        """Requeue jobs abandoned mid-upload and take over jobs of vanished hosts"""
+        self._last_sweep = datetime.utcnow()
+        requeued = await upload_jobs_repo.requeue_stale(
+            UPLOAD_STALE_SECONDS, UPLOAD_MAX_ATTEMPTS, UPLOAD_RETRY_BASE_SECONDS
+        )
+        if requeued:
+            logger.info(f"Requeued {requeued} stale upload jobs")
+        for job in await upload_jobs_repo.fail_stale(UPLOAD_STALE_SECONDS, UPLOAD_MAX_ATTEMPTS):
+            logger.info(f"Upload job {job['_id']} of host {job['host']} failed after {UPLOAD_MAX_ATTEMPTS} attempts")
+            if job.get("host") == self.host and os.path.exists(job.get("staged_path") or ""):
+                os.remove(job["staged_path"])
+
+        orphans = await upload_jobs_repo.list_queued_elsewhere(self.host, UPLOAD_ORPHAN_SECONDS)
+        for job in orphans:
+            if job.get("bunny") or os.path.exists(job.get("staged_path") or ""):
+                fields = {"host": self.host}
+            else:
+                fields = {"status": "failed", "error": f"Staged file was lost with host {job['host']}"}
+            if await upload_jobs_repo.update_queued(job["_id"], job["host"], fields):
+                logger.info(f"Upload job {job['_id']} of host {job['host']}: {fields}")
+        if orphans and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _stage(self, file: UploadFile) -> tuple:
+        """Copy the upload to the staging directory in bounded chunks"""
+        os.makedirs(UPLOAD_STAGING_DIR, exist_ok=True)
+        path = os.path.join(UPLOAD_STAGING_DIR, uuid.uuid4().hex)
+        loop = asyncio.get_event_loop()
+        size = 0
+        with open(path, "wb") as staged:
+            while True:
+                chunk = await file.read(BUNNY_UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await loop.run_in_executor(None, staged.write, chunk)
+                size += len(chunk)
+        return path, size
+
+    async def submit(
+        self,
+        file: UploadFile,
+        title: str,
+        description: Optional[str],
+        album_id: Optional[str],
+        created_by: str
+    ) -> dict:
+        if await upload_jobs_repo.count_queued(self.host) >= UPLOAD_MAX_QUEUED:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many uploads in progress, please try again later",
+                headers={"Retry-After": "30"}
+            )
+
+        path, size = await self._stage(file)
+        job = {
+            "status": "queued",
+            "title": title,
+            "description": description,
+            "album_id": album_id,
+            "created_by": created_by,
+            "filename": file.filename,
+            "staged_path": path,
+            "size": size,
+            "bytes_uploaded": 0,
+            "progress": 0.0,
+            "attempts": 0,
+            "host": self.host,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+        job["_id"] = await upload_jobs_repo.insert(job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def _worker(self, name: str):
+        while True:
+            if datetime.utcnow() - self._last_sweep >= timedelta(seconds=UPLOAD_SWEEP_SECONDS):
+                try:
+                    await self.sweep()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Upload worker {name} could not sweep stale jobs: {e}")
+
+            try:
+                job = await upload_jobs_repo.claim_next(self.host, name)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Upload worker {name} could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), UPLOAD_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._process(job)
+
+    async def _process(self, job: dict):
+        job_id = str(job["_id"])
+        self._active[job_id] = job
+
+        def on_progress(sent: int):
+            job["bytes_uploaded"] = sent
+            job["progress"] = round(sent / job["size"], 4) if job.get("size") else 0.0
+            job["updated_at"] = datetime.utcnow()
+
+        async def save_progress():
+            # Persist progress periodically while the upload streams
+            while True:
+                await asyncio.sleep(UPLOAD_PROGRESS_INTERVAL)
+                await upload_jobs_repo.update_fields(job["_id"], {
+                    "bytes_uploaded": job.get("bytes_uploaded", 0),
+                    "progress": job.get("progress", 0.0)
+                })
+
+        progress_task = asyncio.ensure_future(save_progress())
+        staged = None
+        cancelled = False
+        try:
+            bunny_response = job.get("bunny")
+            if not bunny_response:
+                staged = StagedFile(job["staged_path"])
+                bunny_response = await self.bunny.upload_video(staged, job["title"], on_progress)
+                if not bunny_response:
+                    raise RuntimeError("Failed to upload video")
+                job["bunny"] = bunny_response
+                await upload_jobs_repo.update_fields(job["_id"], {"bunny": bunny_response})
+
+            # The job id doubles as the video id, so a retry finds its own insert
+            if not await videos_repo.find_by_id(job_id):
+                video_data = {
+                    "id": job_id,
+                    "title": job["title"],
+                    "description": job.get("description"),
+                    "url": bunny_response["url"],
+                    "thumbnail_url": bunny_response["thumbnail"],
+                    "video_id": bunny_response["video_id"],
+                    "album_id": job.get("album_id"),
+                    "created_by": job["created_by"],
+                    "created_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
+                }
+                await add_video(video_data)
+
+            job.update({
+                "status": "completed",
+                "progress": 1.0,
+                # The public id the videos endpoints look the video up by
+                "video_id": job_id,
+                "bytes_per_second": bunny_response["bytes_per_second"],
+                "error": None
+            })
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back instead of leaving it uploading,
+            # without spending one of its attempts
+            cancelled = True
+            job.update({
+                "status": "queued",
+                "attempts": max(job.get("attempts", 1) - 1, 0),
+                "retry_after": None
+            })
+        except Exception as e:
+            logger.error(f"Upload job {job_id} failed: {e}")
+            can_resume = job.get("bunny") or os.path.exists(job["staged_path"])
+            retry = job.get("attempts", 1) < UPLOAD_MAX_ATTEMPTS and can_resume
+            job.update({"status": "queued" if retry else "failed", "error": str(e), "retry_after": None})
+            if retry:
+                delay = UPLOAD_RETRY_BASE_SECONDS * 2 ** (job.get("attempts", 1) - 1)
+                job["retry_after"] = datetime.utcnow() + timedelta(seconds=delay)
+        finally:
+            progress_task.cancel()
+            if staged is not None:
+                staged.close()
+
+        try:
+            await upload_jobs_repo.update_fields(job["_id"], {
+                key: job.get(key)
+                for key in ("status", "attempts", "retry_after", "progress", "bytes_uploaded", "video_id",
+                            "bytes_per_second", "error")
+            })
+        finally:
+            self._active.pop(job_id, None)
+            if job["status"] in TERMINAL_STATUSES and os.path.exists(job["staged_path"]):
+                os.remove(job["staged_path"])
+        if cancelled:
+            raise asyncio.CancelledError()
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        return self._active.get(job_id) or await upload_jobs_repo.find_by_id(job_id)
+
+    async def events(self, job_id: str):
+        """Server-sent events with the job's state until it completes or fails"""
+        last = None
+        while True:
+            job = await self.get_job(job_id)
+            if job is None:
+                yield "event: error\ndata: {\"detail\": \"Job not found\"}\n\n"
+                return
+            snapshot = serialize_job(job)
+            snapshot.pop("updated_at")
+            if snapshot != last:
+                yield f"data: {json.dumps(snapshot)}\n\n"
+                last = snapshot
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(UPLOAD_EVENTS_INTERVAL)
+
+upload_jobs = UploadJobManager(bunny_service)
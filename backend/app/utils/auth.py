@@ -1,4 +1,3 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -6,8 +5,10 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import os
 from dotenv import load_dotenv
-from ..utils.db import get_db
-from bson import ObjectId
+from ..repositories.users import users_repo
+from .cache import TTLCache
+from .passwords import pwd_context, verify_password, get_password_hash
+import time
 import logging
 
 # Set up logging
@@ -21,18 +22,23 @@ SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # Increase to 24 hours
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Authenticated-principal cache. Entries are dropped by invalidate_user() when an
+# admin changes a user, and otherwise expire after AUTH_CACHE_TTL_SECONDS (which
+# bounds staleness across worker processes).
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+_token_cache = TTLCache(AUTH_CACHE_MAX_SIZE, AUTH_CACHE_TTL_SECONDS)
+_principal_cache = TTLCache(AUTH_CACHE_MAX_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+# Stateless authorization: when enabled, role claims signed into the token are
+# trusted as long as their "ver" matches the user's current token_version, so a
+# request only needs the (cached) version number instead of the user document.
+AUTH_STATELESS_CLAIMS = os.getenv("AUTH_STATELESS_CLAIMS", "false").lower() == "true"
+_version_cache = TTLCache(AUTH_CACHE_MAX_SIZE, AUTH_CACHE_TTL_SECONDS)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -40,6 +46,46 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def build_token_claims(user: dict) -> dict:
+    """Claims signed into an access token for the given user document"""
+    return {
+        "sub": str(user["_id"]),
+        "email": user["email"],
+        "is_admin": user.get("is_admin", False),
+        "is_approved": user.get("is_approved", False),
+        "ver": user.get("token_version", 0)
+    }
+
+def invalidate_user(user_id: str):
+    """Drop the cached principal for a user after their roles change"""
+    _principal_cache.pop(str(user_id))
+    _version_cache.pop(str(user_id))
+
+def invalidate_users(user_ids):
+    """invalidate_user() for every id of a bulk change"""
+    for user_id in user_ids:
+        invalidate_user(user_id)
+
+async def get_token_version(user_id: str) -> Optional[int]:
+    version = _version_cache.get(user_id)
+    if version is None:
+        user = await users_repo.find_by_id(user_id, {"token_version": 1})
+        if user is None:
+            return None
+        version = user.get("token_version", 0)
+        _version_cache.set(user_id, version)
+    return version
+
+def _decode_token(token: str) -> dict:
+    payload = _token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        _token_cache.set(token, payload)
+    elif payload.get("exp", 0) <= time.time():
+        _token_cache.pop(token)
+        raise JWTError("Signature has expired.")
+    return payload
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -47,38 +93,50 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        logger.info(f"Validating token: {token[:10]}...")
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        logger.info(f"Token payload: {payload}")
+        payload = _decode_token(token)
         user_id = payload.get("sub")
-        logger.info(f"Looking for user with ID: {user_id}")
         
         if user_id is None:
             logger.error("No user_id in token")
             raise credentials_exception
         
-        # Get user from database
-        db = get_db()
-        # Log all users in database
-        all_users = list(db.users.find())
-        logger.info(f"All users in DB: {[str(u['_id']) for u in all_users]}")
-        
-        user = db.users.find_one({"_id": ObjectId(user_id)})
-        logger.info(f"Found user: {user}")
+        if AUTH_STATELESS_CLAIMS and "ver" in payload:
+            # Roles changed since the token was issued: refuse it so the
+            # client logs in again and gets fresh claims
+            if await get_token_version(user_id) != payload["ver"]:
+                logger.info(f"Stale token version for user: {user_id}")
+                raise credentials_exception
+            return {
+                "sub": user_id,
+                "email": payload.get("email"),
+                "is_admin": payload.get("is_admin", False),
+                "is_approved": payload.get("is_approved", False)
+            }
         
-        if user is None:
-            logger.error(f"No user found for id: {user_id}")
-            raise credentials_exception
+        principal = _principal_cache.get(user_id)
+        if principal is None:
+            # Get user from database
+            user = await users_repo.find_by_id(user_id, {"hashed_password": 0})
             
-        return {
-            "sub": str(user["_id"]),
-            "email": user["email"],
-            "is_admin": user.get("is_admin", False),
-            "is_approved": user.get("is_approved", False)
-        }
+            if user is None:
+                logger.error(f"No user found for id: {user_id}")
+                raise credentials_exception
+            
+            principal = {
+                "sub": str(user["_id"]),
+                "email": user["email"],
+                "is_admin": user.get("is_admin", False),
+                "is_approved": user.get("is_approved", False)
+            }
+            _principal_cache.set(user_id, principal)
+        
+        # Handlers get their own copy so they cannot modify the cached entry
+        return dict(principal)
     except JWTError as e:
         logger.error(f"JWT decode error: {e}")
         raise credentials_exception
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error in get_current_user: {e}")
         logger.exception(e)  # This will log the full stack trace
@@ -1,38 +1,135 @@
 from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import os
+import threading
 import logging
+from dotenv import load_dotenv
+from .indexes import ensure_indexes
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_db():
+load_dotenv()
+
+# MongoDB settings
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "video_portal")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+
+_client = None
+_client_lock = threading.Lock()
+_async_client = None
+_async_client_loop = None
+
+def _client_options():
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    }
+
+def get_client() -> MongoClient:
+    """Return the process-wide MongoClient, creating it on first use.
+
+    MongoClient is thread-safe and keeps its own connection pool, so a single
+    instance is shared by every request handler, init_db() and the scripts.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(MONGODB_URL, **_client_options())
+                logger.info(
+                    f"Created MongoDB client for {DATABASE_NAME} "
+                    f"(maxPoolSize={MONGO_MAX_POOL_SIZE})"
+                )
+    return _client
+
+def get_db(name: str = None):
+    """Return a handle to the application database on the shared client."""
+    return get_client()[name or DATABASE_NAME]
+
+def ping_db():
+    """Check that MongoDB is reachable; raises if it is not."""
     try:
-        # Create a single client instance
-        client = MongoClient("mongodb://localhost:27017")
-        db = client.video_portal
-        # Test the connection
-        db.command('ping')
+        get_db().command('ping')
         logger.info("Connected to MongoDB")
-        return db
     except Exception as e:
         logger.error(f"MongoDB connection error: {e}")
         raise
 
+def close_db():
+    """Close the shared client. A later get_db() call opens a new one."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+            logger.info("Closed MongoDB client")
+
+def get_async_client() -> AsyncIOMotorClient:
+    """Return the Motor client for the running event loop.
+
+    Motor clients are bound to the loop they were created on. In production
+    there is one loop per worker, so this is created once; the test client
+    runs each request on a fresh loop, in which case a new client is made.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_event_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        if _async_client is not None:
+            _async_client.close()
+        _async_client = AsyncIOMotorClient(MONGODB_URL, io_loop=loop, **_client_options())
+        _async_client_loop = loop
+        logger.info(
+            f"Created async MongoDB client for {DATABASE_NAME} "
+            f"(maxPoolSize={MONGO_MAX_POOL_SIZE})"
+        )
+    return _async_client
+
+def get_async_db(name: str = None):
+    """Return a Motor handle to the application database."""
+    return get_async_client()[name or DATABASE_NAME]
+
+def close_async_db():
+    """Close the Motor client of the current worker, if any."""
+    global _async_client, _async_client_loop
+    if _async_client is not None:
+        _async_client.close()
+        _async_client = None
+        _async_client_loop = None
+        logger.info("Closed async MongoDB client")
+
 def init_db():
-    """Initialize database with required collections"""
+    """Initialize database with required collections and indexes"""
     try:
+        ping_db()
         db = get_db()
+        existing = db.list_collection_names()
         # Create collections if they don't exist
-        if 'users' not in db.list_collection_names():
+        if 'users' not in existing:
             db.create_collection('users')
             logger.info("Created users collection")
-        if 'albums' not in db.list_collection_names():
+        if 'albums' not in existing:
             db.create_collection('albums')
             logger.info("Created albums collection")
-        if 'videos' not in db.list_collection_names():
+        if 'videos' not in existing:
             db.create_collection('videos')
             logger.info("Created videos collection")
+        ensure_indexes(db)
         return db
     except Exception as e:
         logger.error(f"Database initialization error: {e}")
-        raise 
\ No newline at end of file
+        raise
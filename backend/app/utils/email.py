@@ -2,7 +2,9 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
+from typing import List, Optional
 from dotenv import load_dotenv
+from ..repositories.email_outbox import email_outbox_repo
 
 load_dotenv()
 
@@ -10,31 +12,87 @@ SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USERNAME = os.getenv("SMTP_USERNAME")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
 
-async def send_approval_email(user_email: str):
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = SMTP_USERNAME
-        msg['To'] = user_email
-        msg['Subject'] = "Your Video Portal Account has been Approved!"
-
-        body = """
+APPROVAL_SUBJECT = "Your Video Portal Account has been Approved!"
+APPROVAL_BODY = """
         Congratulations! Your Video Portal account has been approved.
         You can now access and watch all available videos on the platform.
         
         Best regards,
         The Video Portal Team
         """
-        
-        msg.attach(MIMEText(body, 'plain'))
 
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        
-        return True
-    except Exception as e:
-        print(f"Failed to send email: {str(e)}")
-        return False 
\ No newline at end of file
+def approval_message(user_email: str) -> dict:
+    return {"to": user_email, "subject": APPROVAL_SUBJECT, "body": APPROVAL_BODY}
+
+class SMTPSender:
+    """Blocking SMTP client that keeps one connection open across messages.
+
+    Connecting, STARTTLS and login happen once; later sends reuse the
+    session until close() or until the server drops it. Not thread-safe:
+    use it from a single worker thread.
+    """
+
+    def __init__(
+        self,
+        host: str = SMTP_SERVER,
+        port: int = SMTP_PORT,
+        username: Optional[str] = SMTP_USERNAME,
+        password: Optional[str] = SMTP_PASSWORD,
+        use_tls: bool = SMTP_USE_TLS,
+        timeout: float = SMTP_TIMEOUT
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.connections = 0
+        self._server = None
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        self.connections += 1
+        return server
+
+    def send(self, message: dict):
+        msg = MIMEMultipart()
+        msg['From'] = self.username or "no-reply@localhost"
+        msg['To'] = message["to"]
+        msg['Subject'] = message["subject"]
+        msg.attach(MIMEText(message["body"], 'plain'))
+
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # The server closed an idle session; reconnect once and resend
+            self._server = self._connect()
+            self._server.send_message(msg)
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except smtplib.SMTPException:
+                pass
+            finally:
+                self._server = None
+
+async def send_approval_email(user_email: str):
+    """Queue the approval email; the email worker delivers it"""
+    await email_outbox_repo.enqueue([approval_message(user_email)])
+    return True
+
+async def send_approval_emails(user_emails: List[str]) -> int:
+    """Queue approval emails for many users with one insert"""
+    await email_outbox_repo.enqueue([approval_message(email) for email in user_emails])
+    return len(user_emails)
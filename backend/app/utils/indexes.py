@@ -0,0 +1,169 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Indexes backing the queries issued by the routers. Names are fixed so that
+# create_indexes() is a no-op when the index already exists.
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel(
+            [("is_approved", ASCENDING), ("is_admin", ASCENDING), ("email", ASCENDING)],
+            name="approval_email"
+        ),
+        # The admins bucket only filters on is_admin, which is not a prefix of approval_email
+        IndexModel([("is_admin", ASCENDING), ("email", ASCENDING)], name="admin_email"),
+        IndexModel([("approval_batch", ASCENDING)], name="approval_batch", sparse=True),
+    ],
+    "albums": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True, sparse=True),
+        IndexModel([("import_key", ASCENDING)], name="import_key_unique", unique=True, sparse=True),
+        IndexModel(
+            [("is_active", ASCENDING), ("_id", ASCENDING)],
+            name="is_active_id_partial",
+            partialFilterExpression={"is_active": True}
+        ),
+        IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at_id"),
+    ],
+    "videos": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True, sparse=True),
+        IndexModel([("import_key", ASCENDING)], name="import_key_unique", unique=True, sparse=True),
+        IndexModel([("share_token", ASCENDING)], name="share_token_unique", unique=True, sparse=True),
+        IndexModel([("album_id", ASCENDING), ("_id", ASCENDING)], name="album_id_id"),
+        IndexModel([("video_id", ASCENDING)], name="video_id"),
+        # Title matches outrank description matches in search results
+        IndexModel(
+            [("title", TEXT), ("description", TEXT)],
+            name="title_description_text",
+            weights={"title": 10, "description": 2},
+            default_language="english"
+        ),
+        IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at_id"),
+    ],
+    "upload_jobs": [
+        IndexModel(
+            [("status", ASCENDING), ("host", ASCENDING), ("created_at", ASCENDING)],
+            name="status_host_created_at"
+        ),
+    ],
+    "playback_progress": [
+        IndexModel([("user_id", ASCENDING), ("album_id", ASCENDING)], name="user_id_album_id"),
+    ],
+    "email_outbox": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+    ],
+}
+
+# Indexes superseded by entries in INDEXES, dropped when found
+OBSOLETE_INDEXES = {
+    "albums": ["is_active_partial"],
+    "videos": ["album_id"],
+}
+
+# Queries on the request path that must be served from an index whose leading
+# key bounds the scan. Values are placeholders; only the shape of the query
+# matters to the planner.
+HOT_QUERIES = [
+    {"name": "login", "collection": "users", "filter": {"email": "probe@example.com"}},
+    {"name": "pending users by email", "collection": "users",
+     "filter": {"is_approved": False, "is_admin": False, "email": {"$regex": "^probe"}},
+     "sort": [("email", ASCENDING)], "limit": 51},
+    {"name": "approved users by email", "collection": "users",
+     "filter": {"is_approved": True, "is_admin": {"$ne": True}},
+     "sort": [("email", ASCENDING)], "limit": 51},
+    {"name": "admins by email", "collection": "users", "filter": {"is_admin": True},
+     "sort": [("email", ASCENDING)], "limit": 51},
+    {"name": "album by id", "collection": "albums", "filter": {"id": "probe"}},
+    {"name": "active albums page", "collection": "albums", "filter": {"is_active": True},
+     "sort": [("_id", ASCENDING)], "limit": 51},
+    {"name": "video by id", "collection": "videos", "filter": {"id": "probe"}},
+    {"name": "video by share token", "collection": "videos", "filter": {"share_token": "probe"}},
+    {"name": "album videos page", "collection": "videos", "filter": {"album_id": "probe"},
+     "sort": [("_id", ASCENDING)], "limit": 51},
+    {"name": "album by id or _id", "collection": "albums",
+     "filter": {"$or": [{"id": "000000000000000000000000"},
+                        {"_id": ObjectId("000000000000000000000000")}]}},
+    {"name": "video search", "collection": "videos",
+     "filter": {"$text": {"$search": "probe"}}, "limit": 20},
+    {"name": "videos by bunny guid", "collection": "videos",
+     "filter": {"video_id": {"$in": ["probe1", "probe2"]}}},
+    {"name": "album resume positions", "collection": "playback_progress",
+     "filter": {"user_id": "probe", "album_id": "probe"}},
+    {"name": "due outbox emails", "collection": "email_outbox",
+     "filter": {"status": "pending", "next_attempt_at": {"$lte": datetime(2024, 1, 1)}},
+     "sort": [("next_attempt_at", ASCENDING)], "limit": 50},
+    {"name": "next upload job", "collection": "upload_jobs",
+     "filter": {"status": "queued", "host": "probe"},
+     "sort": [("created_at", ASCENDING)], "limit": 1},
+]
+
+def ensure_indexes(db):
+    """Create the indexes in INDEXES. Safe to call on every startup."""
+    for collection, names in OBSOLETE_INDEXES.items():
+        existing = db[collection].index_information()
+        for name in names:
+            if name in existing:
+                db[collection].drop_index(name)
+                logger.info(f"Dropped obsolete index {name} on {collection}")
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                db[collection].create_indexes([model])
+            except OperationFailure as e:
+                # Conflicting definitions or duplicate keys must not stop startup
+                logger.error(f"Could not create index {model.document['name']} on {collection}: {e}")
+
+def _plan_stages(plan):
+    """Yield every stage name found in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+_FULL_RANGE = ("[MinKey, MaxKey]", "[MaxKey, MinKey]")
+
+def full_range_scans(plan):
+    """Names of the indexes an explain() plan tree scans end to end.
+
+    An IXSCAN whose leading key is unbounded reads every index entry, which
+    costs as much as a COLLSCAN while looking indexed.
+    """
+    scans = []
+    if isinstance(plan, dict):
+        if plan.get("stage") == "IXSCAN" and plan.get("keyPattern"):
+            leading_key = next(iter(plan["keyPattern"]))
+            bounds = plan.get("indexBounds", {}).get(leading_key) or []
+            if len(bounds) == 1 and bounds[0] in _FULL_RANGE:
+                scans.append(plan.get("indexName"))
+        for value in plan.values():
+            scans.extend(full_range_scans(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            scans.extend(full_range_scans(item))
+    return scans
+
+def check_query_plans(db, queries=None):
+    """Explain each hot query; return the names of those using COLLSCAN or a full index scan."""
+    failures = []
+    for query in queries or HOT_QUERIES:
+        cursor = db[query["collection"]].find(query["filter"], query.get("projection"))
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        if query.get("limit"):
+            cursor = cursor.limit(query["limit"])
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = list(_plan_stages(winning_plan))
+        logger.info(f"{query['name']}: {' <- '.join(stages)}")
+        if "COLLSCAN" in stages or full_range_scans(winning_plan):
+            failures.append(query["name"])
+    return failures
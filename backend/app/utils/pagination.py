@@ -0,0 +1,53 @@
+from fastapi import HTTPException, Response, status
+from bson import ObjectId
+from bson.errors import InvalidId
+from typing import List, Optional, Union
+import base64
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Cursors carry a one-byte type tag so lists keyed on strings (e.g. email)
+# share the same opaque format as lists keyed on _id
+_OBJECT_ID_TAG = b"o"
+_STRING_TAG = b"s"
+
+def encode_cursor(last_key: Union[ObjectId, str]) -> str:
+    """Opaque cursor pointing just past the given sort key"""
+    if isinstance(last_key, ObjectId):
+        raw = _OBJECT_ID_TAG + last_key.binary
+    else:
+        raw = _STRING_TAG + str(last_key).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str], expected_type: type = ObjectId):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode())
+        if raw[:1] == _OBJECT_ID_TAG:
+            value = ObjectId(raw[1:])
+        elif raw[:1] == _STRING_TAG:
+            value = raw[1:].decode()
+        else:
+            raise ValueError("Unknown cursor type")
+    except (InvalidId, ValueError, TypeError):
+        value = None
+    if not isinstance(value, expected_type):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return value
+
+def paginate(response: Response, docs: List[dict], limit: int, key: str = "_id") -> List[dict]:
+    """Trim a page fetched with limit + 1 and set the next-cursor header.
+
+    Must be called before ObjectIds are converted to strings.
+    """
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(docs[-1][key])
+    return docs
@@ -0,0 +1,40 @@
+from typing import Any, Optional, Type
+from bson import ObjectId
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import orjson
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """orjson encoding used by every response, also for streamed NDJSON lines"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson; datetimes come out in ISO format
+    and ObjectIds as strings"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def json_response(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """Encode content as-is, skipping FastAPI's jsonable_encoder pass.
+
+    Headers already set on the endpoint's injected `response` (ETag,
+    X-Next-Cursor) are carried over, since FastAPI drops them when an
+    endpoint returns its own Response.
+    """
+    headers = dict(response.headers) if response is not None else None
+    return FastJSONResponse(content, headers=headers)
+
+def trusted_payload(model: Type[BaseModel], doc: dict) -> dict:
+    """The model's fields of a document this app wrote and validated itself.
+
+    Same output as model(**doc), via Model.construct so the validators and
+    type coercion do not run again on every read.
+    """
+    return model.construct(**{name: doc[name] for name in model.__fields__ if name in doc}).__dict__
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+
+def _stored(value):
+    # Mongo keeps dates to the millisecond; compare against what it stores
+    if isinstance(value, datetime):
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {key: _stored(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_stored(item) for item in value]
+    return value
+
+def changed_pipeline(fields: dict, now: datetime, always: Optional[dict] = None,
+                     on_insert: Optional[dict] = None) -> list:
+    """Update pipeline setting `fields`, moving updated_at to `now` only if one of them changes.
+
+    `always` fields (sync bookkeeping and the like) are written too but do not
+    count as a change; `on_insert` fields are only filled in when missing, as
+    $setOnInsert would in a regular upsert. Unchanged documents are left
+    untouched, so they are not reported as modified and not picked up by
+    `since` exports.
+    """
+    fields = _stored(fields)
+    changed = {"$or": [{"$ne": [f"${name}", {"$literal": value}]} for name, value in fields.items()]}
+    stage = {name: {"$literal": value} for name, value in fields.items()}
+    for name, value in _stored(always or {}).items():
+        stage[name] = {"$literal": value}
+    for name, value in _stored(on_insert or {}).items():
+        stage[name] = {"$ifNull": [f"${name}", {"$literal": value}]}
+    stage["updated_at"] = {"$cond": [changed, now, "$updated_at"]}
+    return [{"$set": stage}]
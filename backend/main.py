@@ -1,20 +1,34 @@
-from fastapi import FastAPI, HTTPException, status, Depends
+from fastapi import FastAPI, HTTPException, status, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pymongo import MongoClient
+from fastapi.responses import JSONResponse
 from bson import ObjectId
 from datetime import datetime
 from pydantic import BaseModel, EmailStr
 from app.utils.auth import (
-    verify_password,
-    get_password_hash,
     create_access_token,
+    build_token_claims,
     get_current_user,
     get_current_admin_user,
+    get_token_version,
     SECRET_KEY,
     ALGORITHM
 )
 from app.routers import admin, videos
-from app.utils.db import init_db, get_db
+from app.utils.responses import FastJSONResponse
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.etag import conditional_response, make_etag
+from app.utils.db import init_db, close_db, close_async_db
+from app.utils.passwords import hash_password, verify_and_update_password, shutdown_password_pool
+from app.services.upload_jobs import upload_jobs
+from app.services.email_outbox import email_worker
+from app.services.title_index import title_index
+from app.services.playback_progress import progress_buffer
+from app.services.bunny_service import bunny_service
+from app.services.bunny_sync import bunny_sync
+from app.services.bunny_client import BunnyUnavailableError
+from app.repositories.users import users_repo
+from app.repositories.albums import albums_repo
+from app.repositories.videos import videos_repo
 import logging
 
 # Set up logging
@@ -24,7 +38,8 @@ logger = logging.getLogger(__name__)
 # Add this import for OAuth2 bearer token
 from fastapi.security import OAuth2PasswordBearer
 
-app = FastAPI()
+# orjson for every response; hot read endpoints also skip jsonable_encoder
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Enable CORS
 app.add_middleware(
@@ -33,14 +48,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"]
+    # Credentialed requests treat "*" as a literal header name, so the
+    # headers the frontend reads must be listed
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"]
 )
 
-# MongoDB connection
-MONGO_URL = "mongodb://localhost:27017"
-client = MongoClient(MONGO_URL)
-db = client.video_portal
-
 # Add this near the top with other initializations
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
@@ -56,6 +68,31 @@ class UserCreate(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    await upload_jobs.start()
+    await email_worker.start()
+    await title_index.start()
+    await progress_buffer.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await upload_jobs.stop()
+    await email_worker.stop()
+    await title_index.stop()
+    await progress_buffer.stop()
+    await bunny_sync.stop()
+    await bunny_service.close()
+    close_async_db()
+    close_db()
+    shutdown_password_pool()
+
+@app.exception_handler(BunnyUnavailableError)
+async def bunny_unavailable_handler(request, exc: BunnyUnavailableError):
+    logger.error(f"Bunny.net unavailable: {exc}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Video service is temporarily unavailable, please try again later"},
+        headers={"Retry-After": "30"}
+    )
 
 @app.get("/")
 async def root():
@@ -64,7 +101,7 @@ async def root():
 @app.post("/api/auth/login")
 async def login(user_data: UserLogin):
     logger.info(f"Login attempt for email: {user_data.email}")
-    user = db.users.find_one({"email": user_data.email})
+    user = await users_repo.find_by_email(user_data.email)
     if not user:
         logger.error(f"No user found with email: {user_data.email}")
         raise HTTPException(
@@ -73,14 +110,20 @@ async def login(user_data: UserLogin):
         )
     
     logger.info(f"Found user: {user['_id']}")
-    if not verify_password(user_data.password, user["hashed_password"]):
+    verified, new_hash = await verify_and_update_password(user_data.password, user["hashed_password"])
+    if not verified:
         logger.error("Invalid password")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
-    access_token = create_access_token(data={"sub": str(user["_id"])})
+    if new_hash:
+        # Stored hash uses outdated bcrypt parameters
+        await users_repo.update_fields(str(user["_id"]), {"hashed_password": new_hash})
+        logger.info(f"Rehashed password for user: {user['_id']}")
+    
+    access_token = create_access_token(data=build_token_claims(user))
     logger.info(f"Created token for user: {user['_id']}")
     
     # Make sure all user fields are included in response
@@ -101,14 +144,14 @@ async def login(user_data: UserLogin):
 @app.post("/api/auth/register")
 async def register(user_data: UserCreate):
     # Check if user already exists
-    if db.users.find_one({"email": user_data.email}):
+    if await users_repo.find_by_email(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     user = {
         "email": user_data.email,
         "hashed_password": hashed_password,
@@ -117,8 +160,8 @@ async def register(user_data: UserCreate):
         "created_at": datetime.utcnow()
     }
     
-    result = db.users.insert_one(user)
-    user["_id"] = str(result.inserted_id)
+    inserted_id = await users_repo.insert(user)
+    user["_id"] = str(inserted_id)
     
     return {
         "message": "User created successfully",
@@ -131,25 +174,24 @@ async def register(user_data: UserCreate):
 @app.get("/api/test/create-admin")
 async def create_test_admin():
     try:
-        db = get_db()
         # Create admin user for testing
         admin_data = {
             "email": "admin@example.com",
-            "hashed_password": get_password_hash("admin123"),
+            "hashed_password": await hash_password("admin123"),
             "is_admin": True,
             "is_approved": True,
             "created_at": datetime.utcnow()
         }
         
         # Check if admin already exists
-        existing_admin = db.users.find_one({"email": admin_data["email"]})
+        existing_admin = await users_repo.find_by_email(admin_data["email"])
         if existing_admin:
             return {"message": "Admin user already exists", "id": str(existing_admin["_id"])}
         
-        result = db.users.insert_one(admin_data)
+        inserted_id = await users_repo.insert(admin_data)
         return {
             "message": "Admin user created successfully",
-            "id": str(result.inserted_id)
+            "id": str(inserted_id)
         }
     except Exception as e:
         logger.error(f"Error creating admin: {e}")
@@ -162,7 +204,7 @@ async def create_test_admin():
 async def test_db():
     try:
         # Test MongoDB connection
-        db.users.find_one({})
+        await users_repo.collection.find_one({})
         return {"message": "Database connection successful"}
     except Exception as e:
         raise HTTPException(
@@ -177,9 +219,19 @@ app.include_router(videos.router, prefix="/api/videos", tags=["videos"])
 # Add these new endpoints
 
 @app.get("/api/users/me")
-async def get_current_user_info(current_user: dict = Depends(get_current_user)):
+async def get_current_user_info(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
     """Get current user information"""
-    user = db.users.find_one({"_id": ObjectId(current_user["sub"])})
+    # Users only change through role updates, which bump token_version
+    version = await get_token_version(current_user["sub"])
+    not_modified = conditional_response(request, response, make_etag(current_user["sub"], version))
+    if not_modified:
+        return not_modified
+    
+    user = await users_repo.find_by_id(current_user["sub"])
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -199,7 +251,7 @@ async def get_albums(current_user: dict = Depends(get_current_user)):
     """Get all video albums"""
     try:
         # Fetch albums from database
-        albums = list(db.albums.find({"is_active": True}))
+        albums = await albums_repo.list_active()
         
         # Convert ObjectId to string for JSON serialization
         for album in albums:
@@ -228,12 +280,13 @@ async def create_album(
             "description": description,
             "created_by": ObjectId(current_user["sub"]),
             "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
             "is_active": True,
             "videos": []
         }
         
-        result = db.albums.insert_one(album)
-        album["_id"] = str(result.inserted_id)
+        inserted_id = await albums_repo.insert(album)
+        album["_id"] = str(inserted_id)
         album["created_by"] = str(album["created_by"])
         
         return album
@@ -248,8 +301,7 @@ async def get_shared_video(share_token: str, current_user: dict = Depends(get_cu
     """Get video by share token"""
     try:
         # First check if user exists and is approved
-        db = get_db()
-        user = db.users.find_one({"_id": ObjectId(current_user["sub"])})
+        user = await users_repo.find_by_id(current_user["sub"])
         
         if not user:
             raise HTTPException(
@@ -265,7 +317,7 @@ async def get_shared_video(share_token: str, current_user: dict = Depends(get_cu
             )
         
         # Then look for the video
-        video = db.videos.find_one({"share_token": share_token})
+        video = await videos_repo.find_by_share_token(share_token)
         if not video:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
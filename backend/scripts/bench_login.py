@@ -0,0 +1,73 @@
+"""Measure login latency under concurrency against a running API.
+
+Usage: python bench_login.py --email admin@example.com --password admin123 \
+           --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def run(args):
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+        async def one_login():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/auth/login",
+                    json={"email": args.email, "password": args.password}
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        # Probe that runs alongside the logins to show whether the loop is blocked
+        async def probe():
+            probe_latencies = []
+            while len(latencies) < args.requests:
+                start = time.perf_counter()
+                await client.get("/")
+                probe_latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.05)
+            return probe_latencies
+
+        started = time.perf_counter()
+        probe_task = asyncio.ensure_future(probe())
+        await asyncio.gather(*(one_login() for _ in range(args.requests)))
+        probe_latencies = await probe_task
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.requests} logins in {elapsed:.2f}s ({args.requests / elapsed:.1f}/s)")
+    print(f"status codes: {statuses}")
+    print(
+        f"login ms  p50={percentile(latencies, 50):.1f} "
+        f"p95={percentile(latencies, 95):.1f} "
+        f"p99={percentile(latencies, 99):.1f} "
+        f"mean={statistics.mean(latencies):.1f}"
+    )
+    if probe_latencies:
+        print(
+            f"GET / ms  p50={percentile(probe_latencies, 50):.1f} "
+            f"p99={percentile(probe_latencies, 99):.1f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Login latency benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
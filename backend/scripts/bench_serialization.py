@@ -0,0 +1,97 @@
+"""Compare the response serialization paths of the hot read endpoints.
+
+Runs in-process on synthetic documents, no server or database needed.
+"before" is the old path: a Pydantic model or dict passed through
+jsonable_encoder and the stdlib JSONResponse; "after" is trusted_payload
+plus FastJSONResponse.
+
+Usage: python bench_serialization.py --page-size 50 --rounds 2000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.models.video import Video
+from app.utils.responses import FastJSONResponse, trusted_payload
+
+def video_doc(i):
+    return {
+        "_id": ObjectId(),
+        "id": str(ObjectId()),
+        "title": f"Video {i}",
+        "description": "A talk from the archive " * 4,
+        "url": f"https://iframe.mediadelivery.net/play/1/{ObjectId()}",
+        "thumbnail_url": f"https://vz-example.b-cdn.net/{ObjectId()}/thumbnail.jpg",
+        "video_id": str(ObjectId()),
+        "album_id": str(ObjectId()),
+        "created_by": str(ObjectId()),
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+        "share_token": str(ObjectId()),
+        "duration": 1800,
+        "encoding_status": 4
+    }
+
+def album_doc(i):
+    return {
+        "_id": ObjectId(),
+        "id": str(ObjectId()),
+        "title": f"Album {i}",
+        "description": "Lectures",
+        "created_by": str(ObjectId()),
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+        "video_count": 12,
+        "is_active": True
+    }
+
+def stringify_ids(docs):
+    # What the list endpoints do before returning
+    return [dict(doc, _id=str(doc["_id"])) for doc in docs]
+
+def measure(func, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    video = video_doc(0)
+    videos = stringify_ids(video_doc(i) for i in range(args.page_size))
+    albums = stringify_ids(album_doc(i) for i in range(args.page_size))
+
+    cases = {
+        "GET /videos/{id}": (
+            lambda: JSONResponse(jsonable_encoder(Video(**video))),
+            lambda: FastJSONResponse(trusted_payload(Video, video))
+        ),
+        "GET /albums": (
+            lambda: JSONResponse(jsonable_encoder(albums)),
+            lambda: FastJSONResponse(albums)
+        ),
+        "GET /albums/{id}/videos": (
+            lambda: JSONResponse(jsonable_encoder(videos)),
+            lambda: FastJSONResponse(videos)
+        ),
+    }
+
+    print(f"{'endpoint':<26}{'before us':>12}{'after us':>12}{'speedup':>10}")
+    for name, (before, after) in cases.items():
+        before_us = measure(before, args.rounds)
+        after_us = measure(after, args.rounds)
+        print(f"{name:<26}{before_us:>12.1f}{after_us:>12.1f}{before_us / after_us:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
-from pymongo import MongoClient
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.db import get_db, close_db
 from seed_isopanisad import seed_isopanisad_content
 
 def main():
-    client = MongoClient("mongodb://localhost:27017")
-    db = client.video_portal
+    db = get_db()
     
     # First remove existing Sri Isopanisad album and its videos
     album = db.albums.find_one({"title": "Sri Isopanisad"})
@@ -19,6 +23,7 @@ def main():
     result = seed_isopanisad_content(db)
     print(f"Created album with ID: {result['album_id']}")
     print(f"Added {result['video_count']} videos")
+    close_db()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,5 +1,7 @@
 from bson import ObjectId
 from datetime import datetime
+from app.services.album_stats import stats_pipeline, stats_fields, EMPTY_STATS
+from app.utils.updates import changed_pipeline
 
 def seed_isopanisad_content(db):
     # Use the same video URL for testing
@@ -15,8 +17,8 @@ def seed_isopanisad_content(db):
         "created_by": ObjectId("67bab1e2ece9927dcf021311"),
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
-        "video_count": 10,
-        "is_active": True
+        "is_active": True,
+        **EMPTY_STATS
     }
     
     # Insert the album
@@ -56,6 +58,11 @@ def seed_isopanisad_content(db):
     # Insert all videos
     db.videos.insert_many(videos)
     
+    # Fill in the album's stats from the videos just inserted
+    album_id = str(album["_id"])
+    for row in db.videos.aggregate(stats_pipeline([album_id])):
+        db.albums.update_one({"_id": album["_id"]}, changed_pipeline(stats_fields(row), datetime.utcnow()))
+    
     return {
         "album_id": str(album["_id"]),
         "video_count": len(videos)
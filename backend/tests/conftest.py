@@ -1,11 +1,16 @@
+import os
 import pytest
 from fastapi.testclient import TestClient
-from pymongo import MongoClient
 from datetime import datetime
 from bson import ObjectId
 
+# Point the app's shared client at the test database before it is imported.
+# Always overridden: test_db drops this database after every test.
+os.environ["DATABASE_NAME"] = "video_portal_test"
+
 from main import app
 from app.utils.auth import create_access_token
+from app.utils.db import get_client, get_db
 
 @pytest.fixture
 def client():
@@ -14,11 +19,12 @@ def client():
 @pytest.fixture
 def test_db():
     # Use a test database
-    client = MongoClient("mongodb://localhost:27017")
-    db = client.video_portal_test
+    db = get_db()
+    if not db.name.endswith("_test"):
+        pytest.exit(f"Refusing to run tests against non-test database {db.name}")
     yield db
     # Cleanup after tests
-    client.drop_database('video_portal_test')
+    get_client().drop_database(db.name)
 
 @pytest.fixture
 def admin_token():
@@ -38,6 +44,37 @@ def approved_user_token():
     user_id = str(ObjectId())
     return create_access_token({"sub": user_id, "is_approved": True})
 
+@pytest.fixture
+def make_user():
+    """Builds a user document with the given roles"""
+    def make(email, is_admin=False, is_approved=False):
+        return {
+            "_id": ObjectId(),
+            "email": email,
+            "hashed_password": "somehash",
+            "is_admin": is_admin,
+            "is_approved": is_approved,
+            "created_at": datetime.utcnow()
+        }
+    return make
+
+@pytest.fixture
+def login(test_db, make_user):
+    """Inserts a user with the given roles and returns auth headers for them"""
+    def login_as(email, is_admin=False, is_approved=True):
+        user = make_user(email, is_admin=is_admin, is_approved=is_approved)
+        test_db.users.insert_one(user)
+        return {"Authorization": f"Bearer {create_access_token({'sub': str(user['_id'])})}"}
+    return login_as
+
+@pytest.fixture
+def admin_headers(login):
+    return login("admin@example.com", is_admin=True)
+
+@pytest.fixture
+def approved_headers(login):
+    return login("viewer@example.com")
+
 @pytest.fixture
 def test_album(test_db):
     album = {
@@ -0,0 +1,112 @@
+import json
+import asyncio
+from bson import ObjectId
+from datetime import datetime
+from app.services.catalog_export import backfill_updated_at
+
+def test_users_overview_counts(client, test_db, make_user, admin_headers):
+    test_db.users.insert_many([
+        make_user("pending1@example.com"),
+        make_user("pending2@example.com"),
+        make_user("approved@example.com", is_approved=True)
+    ])
+
+    response = client.get("/api/admin/users/overview?limit=1", headers=admin_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["pending"]["count"] == 2
+    assert len(data["pending"]["users"]) == 1
+    assert data["approved"]["count"] == 1
+    assert data["admins"]["count"] == 1
+    assert "hashed_password" not in data["pending"]["users"][0]
+
+    # The next page of a bucket continues from the overview's cursor
+    assert data["pending"]["users"][0]["email"] == "pending1@example.com"
+    assert data["approved"]["next_cursor"] is None
+    response = client.get(
+        f"/api/admin/users?bucket=pending&after={data['pending']['next_cursor']}",
+        headers=admin_headers
+    )
+    assert [u["email"] for u in response.json()] == ["pending2@example.com"]
+
+def test_list_users_by_email_prefix(client, test_db, make_user, admin_headers):
+    test_db.users.insert_many([
+        make_user("alice@example.com"),
+        make_user("alan@example.com"),
+        make_user("bob@example.com")
+    ])
+
+    first = client.get("/api/admin/users?bucket=pending&q=al&limit=1", headers=admin_headers)
+    assert first.status_code == 200
+    assert [u["email"] for u in first.json()] == ["alan@example.com"]
+
+    second = client.get(
+        f"/api/admin/users?bucket=pending&q=al&limit=1&after={first.headers['X-Next-Cursor']}",
+        headers=admin_headers
+    )
+    assert [u["email"] for u in second.json()] == ["alice@example.com"]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_approving_twice_changes_nothing(client, test_db, make_user, admin_headers):
+    user = make_user("twice@example.com")
+    test_db.users.insert_one(user)
+
+    first = client.post(f"/api/admin/users/{user['_id']}/approve", headers=admin_headers)
+    assert first.status_code == 200
+    second = client.post(f"/api/admin/users/{user['_id']}/approve", headers=admin_headers)
+    assert second.status_code == 404
+
+    # One version bump and one approval email, from the first call only
+    assert test_db.users.find_one({"_id": user["_id"]})["token_version"] == 1
+    assert test_db.email_outbox.count_documents({}) == 1
+
+def test_bulk_approve_by_ids(client, test_db, make_user, admin_headers):
+    pending = [make_user(f"wave{i}@example.com") for i in range(3)]
+    approved = make_user("already@example.com", is_approved=True)
+    test_db.users.insert_many(pending + [approved])
+
+    response = client.post("/api/admin/users/bulk", headers=admin_headers, json={
+        "action": "approve",
+        "ids": [str(user["_id"]) for user in pending + [approved]] + [str(ObjectId())]
+    })
+    assert response.status_code == 200
+    assert response.json() == {
+        "action": "approve", "matched": 4, "modified": 3, "not_found": 1, "emails_queued": 3
+    }
+    assert test_db.users.count_documents({"email": {"$regex": "^wave"}, "is_approved": True}) == 3
+    assert test_db.email_outbox.count_documents({"status": "pending"}) == 3
+
+def test_bulk_reject_pending_before(client, test_db, make_user, admin_headers):
+    old = dict(make_user("old@example.com"), created_at=datetime(2020, 1, 1))
+    test_db.users.insert_many([old, make_user("new@example.com")])
+
+    response = client.post("/api/admin/users/bulk", headers=admin_headers, json={
+        "action": "reject",
+        "pending_before": "2021-01-01T00:00:00"
+    })
+    assert response.status_code == 200
+    assert response.json()["modified"] == 1
+    assert test_db.users.find_one({"email": "old@example.com"}) is None
+    assert test_db.users.find_one({"email": "new@example.com"}) is not None
+
+def test_export_catalog_ndjson(client, test_db, test_video, admin_headers):
+    response = client.get("/api/admin/export?fields=title&gzip=true", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert {line["_collection"] for line in lines} == {"albums", "videos"}
+    assert all(set(line) == {"_id", "title", "_collection"} for line in lines)
+
+    future = client.get("/api/admin/export?collection=videos&since=2999-01-01T00:00:00", headers=admin_headers)
+    assert future.text == ""
+
+def test_backfill_updated_at(test_db):
+    legacy = {"_id": ObjectId(), "title": "Legacy", "created_at": datetime(2020, 1, 1)}
+    test_db.albums.insert_one(legacy)
+    test_db.videos.insert_one({"title": "No dates"})
+
+    counts = asyncio.run(backfill_updated_at())
+
+    assert counts == {"albums": 1, "videos": 1}
+    assert test_db.albums.find_one({"_id": legacy["_id"]})["updated_at"] == datetime(2020, 1, 1)
+    assert test_db.videos.find_one({"title": "No dates"})["updated_at"] is not None
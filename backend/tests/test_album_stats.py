@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.services.album_stats import add_video, reconcile
+
+def make_video(album_id, title, created_at, **fields):
+    return dict({
+        "id": str(ObjectId()),
+        "title": title,
+        "url": "https://www.youtube.com/watch?v=stats",
+        "album_id": album_id,
+        "created_by": str(ObjectId()),
+        "created_at": created_at,
+        "updated_at": created_at
+    }, **fields)
+
+def test_reconcile_recomputes_drifted_stats(test_db, test_album):
+    now = datetime.utcnow()
+    test_db.videos.insert_many([
+        make_video(test_album["id"], "Old", now - timedelta(days=2), duration=60, thumbnail_url="old.jpg"),
+        make_video(test_album["id"], "New", now, duration=30)
+    ])
+    test_db.albums.update_one({"id": test_album["id"]}, {"$set": {"video_count": 10}})
+    empty = {"_id": ObjectId(), "title": "Empty", "video_count": 3, "is_active": True}
+    test_db.albums.insert_one(empty)
+
+    changed = asyncio.run(reconcile(batch_size=1))
+
+    album = test_db.albums.find_one({"id": test_album["id"]})
+    assert changed == 2
+    assert album["video_count"] == 2
+    assert album["total_duration"] == 90
+    assert album["latest_video"]["title"] == "New"
+    assert album["cover_thumbnail_url"] == "old.jpg"
+    assert test_db.albums.find_one({"_id": empty["_id"]})["video_count"] == 0
+
+def test_add_video_updates_album_by_either_id(test_db):
+    # Seeded albums have no "id"; videos reference them by str(_id)
+    album = {"_id": ObjectId(), "title": "Seeded", "is_active": True}
+    test_db.albums.insert_one(album)
+    album_id = str(album["_id"])
+    now = datetime.utcnow()
+
+    async def run():
+        await add_video(make_video(album_id, "Second", now, duration=20, thumbnail_url="second.jpg"))
+        await add_video(make_video(album_id, "First", now - timedelta(hours=1), duration=10))
+
+    asyncio.run(run())
+    stored = test_db.albums.find_one({"_id": album["_id"]})
+    assert stored["video_count"] == 2
+    assert stored["total_duration"] == 30
+    assert stored["latest_video"]["title"] == "Second"
+    assert stored["cover_thumbnail_url"] == "second.jpg"
+
+def test_reconcile_moves_updated_at_only_on_change(test_db, test_album):
+    test_db.videos.insert_one(make_video(test_album["id"], "Only", datetime(2024, 1, 1)))
+    asyncio.run(reconcile([test_album["id"]]))
+    first = test_db.albums.find_one({"id": test_album["id"]})["updated_at"]
+
+    assert asyncio.run(reconcile([test_album["id"]])) == 0
+    assert test_db.albums.find_one({"id": test_album["id"]})["updated_at"] == first
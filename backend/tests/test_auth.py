@@ -2,6 +2,8 @@ from fastapi.testclient import TestClient
 import pytest
 from bson import ObjectId
 from datetime import datetime
+from app.utils import auth
+from app.utils.auth import build_token_claims, create_access_token
 
 def test_login_success(client, test_db):
     # Create a test user first
@@ -87,4 +89,43 @@ def test_get_current_user(client, approved_user_token):
 
 def test_get_current_user_no_token(client):
     response = client.get("/api/users/me")
-    assert response.status_code == 401 
\ No newline at end of file
+    assert response.status_code == 401
+
+def test_token_claims_include_roles_and_version():
+    user = {
+        "_id": ObjectId(),
+        "email": "claims@example.com",
+        "is_admin": True,
+        "is_approved": True,
+        "token_version": 3
+    }
+    claims = build_token_claims(user)
+    assert claims["sub"] == str(user["_id"])
+    assert claims["is_admin"] is True
+    assert claims["is_approved"] is True
+    assert claims["ver"] == 3
+
+def test_token_with_outdated_version_is_rejected(client, test_db, make_user, admin_headers, monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_STATELESS_CLAIMS", True)
+    user = make_user("roles@example.com", is_approved=True)
+    test_db.users.insert_one(user)
+    headers = {"Authorization": f"Bearer {create_access_token(build_token_claims(user))}"}
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+
+    response = client.put(f"/api/admin/users/{user['_id']}/toggle-admin", headers=admin_headers)
+    assert response.status_code == 200
+
+    response = client.get("/api/users/me", headers=headers)
+    assert response.status_code == 401
+
+def test_outdated_password_hash_is_rehashed():
+    import asyncio
+    from passlib.hash import bcrypt
+    from app.utils.passwords import BCRYPT_ROUNDS, verify_and_update_password
+    old_rounds = 4 if BCRYPT_ROUNDS != 4 else 5
+    old_hash = bcrypt.using(rounds=old_rounds).hash("test123")
+
+    verified, new_hash = asyncio.run(verify_and_update_password("test123", old_hash))
+    assert verified is True
+    assert new_hash is not None
+    assert bcrypt.from_string(new_hash).rounds == BCRYPT_ROUNDS
@@ -0,0 +1,143 @@
+import asyncio
+import httpx
+import pytest
+from app.services.bunny_client import BunnyClient, BunnyUnavailableError, CircuitBreaker
+
+URL = "https://bunny.example/library/1/videos/abc"
+
+def make_client(responses, **kwargs):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        status_code = responses[min(len(calls), len(responses)) - 1]
+        return httpx.Response(status_code, json={"guid": "abc"})
+
+    client = BunnyClient(transport=httpx.MockTransport(handler), retry_base_delay=0, **kwargs)
+    return client, calls
+
+def test_idempotent_call_is_retried():
+    client, calls = make_client([503, 502, 200])
+    response = asyncio.run(client.request("GET", URL, endpoint="get_video_info"))
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert client.metrics()["endpoints"]["get_video_info"]["retries"] == 2
+
+def test_non_idempotent_call_is_not_retried_after_send():
+    client, calls = make_client([500, 200])
+    with pytest.raises(BunnyUnavailableError):
+        asyncio.run(client.request("POST", URL, endpoint="create_video", idempotent=False))
+    assert len(calls) == 1
+
+def test_client_errors_are_not_retried():
+    client, calls = make_client([404])
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.request("GET", URL, endpoint="get_video_info"))
+    assert len(calls) == 1
+    assert client.breaker.state == "closed"
+
+def test_circuit_opens_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client, calls = make_client([503], max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(BunnyUnavailableError):
+            asyncio.run(client.request("GET", URL, endpoint="get_video_info"))
+    assert breaker.state == "open"
+
+    with pytest.raises(BunnyUnavailableError):
+        asyncio.run(client.request("GET", URL, endpoint="get_video_info"))
+    assert len(calls) == 2
+    assert client.metrics()["endpoints"]["get_video_info"]["rejected"] == 1
+
+def test_circuit_closes_after_successful_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    client, calls = make_client([503, 200], max_retries=0, breaker=breaker)
+    with pytest.raises(BunnyUnavailableError):
+        asyncio.run(client.request("GET", URL, endpoint="get_video_info"))
+    assert breaker.state == "half_open"
+    asyncio.run(client.request("GET", URL, endpoint="get_video_info"))
+    assert breaker.state == "closed"
+
+def test_trial_that_raises_does_not_wedge_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    outcomes = [ValueError("body read failed"), httpx.Response(200, json={})]
+
+    def handler(request):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    client = BunnyClient(transport=httpx.MockTransport(handler), retry_base_delay=0, breaker=breaker)
+    with pytest.raises(ValueError):
+        asyncio.run(client.request("GET", URL, endpoint="get_video_info"))
+    assert breaker.failures == 2
+    assert asyncio.run(client.request("GET", URL, endpoint="get_video_info")).status_code == 200
+    assert breaker.state == "closed"
+
+def make_service(handler):
+    from app.services.bunny_service import BunnyService
+    client = BunnyClient(transport=httpx.MockTransport(handler), retry_base_delay=0)
+    service = BunnyService(client=client)
+    service.base_url = "https://bunny.example/library"
+    service.library_id = "1"
+    service.headers = {"Accept": "application/json", "AccessKey": "test-key"}
+    return service
+
+def test_concurrent_info_lookups_share_one_request():
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"guid": "abc", "length": 42})
+
+    service = make_service(handler)
+
+    async def run():
+        results = await asyncio.gather(*(service.get_video_info("abc") for _ in range(5)))
+        cached = await service.get_video_info("abc")
+        return results, cached
+
+    results, cached = asyncio.run(run())
+    assert all(result["length"] == 42 for result in results)
+    assert cached["length"] == 42
+    assert len(calls) == 1
+
+def test_batch_info_lookup_and_invalidation():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"guid": request.url.path.rsplit("/", 1)[-1]})
+
+    service = make_service(handler)
+
+    async def run():
+        first = await service.get_videos_info(["a", "b", "a"])
+        await service.get_videos_info(["a", "b"])
+        service.invalidate_video_info("a")
+        await service.get_videos_info(["a", "b"])
+        return first
+
+    first = asyncio.run(run())
+    assert set(first) == {"a", "b"}
+    assert first["a"]["guid"] == "a"
+    assert len(calls) == 3
+
+def test_batch_info_lookup_reports_missing_videos():
+    def handler(request):
+        guid = request.url.path.rsplit("/", 1)[-1]
+        if guid == "gone":
+            return httpx.Response(404)
+        if guid == "broken":
+            return httpx.Response(403)
+        return httpx.Response(200, json={"guid": guid})
+
+    service = make_service(handler)
+    missing = set()
+    infos = asyncio.run(service.get_videos_info(["a", "gone", "broken"], missing=missing))
+
+    assert infos == {"a": {"guid": "a"}, "gone": None, "broken": None}
+    assert missing == {"gone"}
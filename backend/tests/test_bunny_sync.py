@@ -0,0 +1,86 @@
+import asyncio
+import httpx
+from datetime import datetime
+from app.services.bunny_client import BunnyClient
+from app.services.bunny_sync import BunnyLibrarySync, parse_bunny_date
+
+def make_sync(library, lookups=None):
+    from app.services.bunny_service import BunnyService
+
+    def handler(request):
+        if "page" not in request.url.params:
+            # Single video lookup: 404 unless in the library
+            guid = request.url.path.rsplit("/", 1)[-1]
+            if lookups is not None:
+                lookups.append(guid)
+            item = next((item for item in library if item["guid"] == guid), None)
+            return httpx.Response(200, json=item) if item else httpx.Response(404)
+        page = int(request.url.params["page"])
+        per_page = int(request.url.params["itemsPerPage"])
+        items = library[(page - 1) * per_page:page * per_page]
+        return httpx.Response(200, json={"totalItems": len(library), "currentPage": page, "items": items})
+
+    service = BunnyService(client=BunnyClient(transport=httpx.MockTransport(handler), retry_base_delay=0))
+    service.base_url = "https://bunny.example/library"
+    service.library_id = "1"
+    service.headers = {"Accept": "application/json", "AccessKey": "test-key"}
+    return BunnyLibrarySync(service)
+
+def bunny_video(guid, uploaded, status=4):
+    return {"guid": guid, "title": guid, "dateUploaded": uploaded, "status": status,
+            "length": 90, "storageSize": 1024, "width": 1920, "height": 1080}
+
+def test_parse_bunny_date():
+    assert parse_bunny_date("2024-03-01T10:20:30.1234567Z") == datetime(2024, 3, 1, 10, 20, 30, 123456)
+    assert parse_bunny_date("2024-03-01T10:20:30") == datetime(2024, 3, 1, 10, 20, 30)
+    assert parse_bunny_date(None) is None
+
+def test_full_sync_updates_metadata_and_flags_orphans(test_db):
+    test_db.videos.insert_many([
+        {"title": "Known", "video_id": "known"},
+        {"title": "Deleted in Bunny", "video_id": "gone"}
+    ])
+    sync = make_sync([
+        bunny_video("extra", "2024-03-02T00:00:00"),
+        bunny_video("known", "2024-03-01T00:00:00")
+    ])
+
+    stats = asyncio.run(sync.run(full=True))
+
+    known = test_db.videos.find_one({"video_id": "known"})
+    assert known["duration"] == 90
+    assert known["encoding_status"] == 4
+    assert known["bunny_orphan"] is False
+    assert test_db.videos.find_one({"video_id": "gone"})["bunny_orphan"] is True
+    assert test_db.bunny_orphans.find_one({"_id": "extra"})["resolved"] is False
+    assert stats["matched"] == 1
+    assert stats["portal_orphans"] == 1
+    state = test_db.sync_state.find_one({"_id": "bunny_library"})
+    assert state["last_uploaded_at"] == datetime(2024, 3, 2)
+
+def test_refresh_marks_videos_missing_from_bunny_and_skips_them(test_db):
+    test_db.videos.insert_one({"title": "Encoding", "video_id": "vanished", "encoding_status": 2})
+    lookups = []
+    sync = make_sync([], lookups)
+
+    asyncio.run(sync.run())
+    assert lookups == ["vanished"]
+    assert test_db.videos.find_one({"video_id": "vanished"})["bunny_missing_at"] is not None
+
+    asyncio.run(sync.run())
+    assert lookups == ["vanished"]
+
+def test_start_does_not_start_a_second_sync():
+    sync = make_sync([])
+
+    async def start_twice():
+        first = sync.start()
+        second = sync.start(full=True)
+        assert sync.running
+        await sync.stop()
+        return first, second
+
+    first, second = asyncio.run(start_twice())
+    assert first is not None
+    assert second is None
+    assert not sync.running
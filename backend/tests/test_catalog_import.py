@@ -0,0 +1,57 @@
+import json
+import asyncio
+from app.services.catalog_import import CatalogImporter, read_manifest
+
+ROWS = [
+    {"type": "album", "key": "iso", "title": "Sri Isopanisad"},
+    {"type": "video", "key": "iso-1", "album": "iso", "title": "Mantra 1",
+     "url": "https://iframe.mediadelivery.net/play/1/a", "duration": 600},
+    {"type": "video", "key": "iso-2", "album": "iso", "title": "Mantra 2",
+     "url": "https://iframe.mediadelivery.net/play/1/b", "duration": 900},
+    {"type": "video", "key": "bad", "album": "iso", "title": "Bad", "url": "https://example.com/x"},
+    {"type": "video", "key": "lost", "album": "nope", "title": "Lost", "url": "https://youtu.be/x"}
+]
+
+def write_jsonl(path, rows):
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n")
+
+def test_read_manifest_csv(tmp_path):
+    manifest = tmp_path / "catalog.csv"
+    manifest.write_text("type,key,title,description\nalbum,iso,Sri Isopanisad,\n")
+    assert list(read_manifest(str(manifest))) == [(2, {"type": "album", "key": "iso", "title": "Sri Isopanisad"})]
+
+def test_import_is_idempotent_and_resumable(tmp_path, test_db):
+    manifest = tmp_path / "catalog.jsonl"
+    write_jsonl(manifest, ROWS)
+
+    report = asyncio.run(CatalogImporter(str(manifest), batch_size=2).run())
+    assert report["invalid"] == 2
+    assert report["inserted"] == 3
+    album = test_db.albums.find_one({"import_key": "iso"})
+    assert album["video_count"] == 2
+    assert album["total_duration"] == 1500
+    assert not (tmp_path / "catalog.jsonl.checkpoint").exists()
+
+    # A checkpoint left by an interrupted run skips the rows already written
+    (tmp_path / "catalog.jsonl.checkpoint").write_text(json.dumps({"line": 3, "albums": []}))
+    report = asyncio.run(CatalogImporter(str(manifest), batch_size=2).run())
+    assert report["skipped"] == 3
+    assert report["inserted"] == 0
+    assert test_db.videos.count_documents({"import_key": {"$exists": True}}) == 2
+
+def test_reimport_only_touches_changed_rows(tmp_path, test_db):
+    manifest = tmp_path / "catalog.jsonl"
+    write_jsonl(manifest, ROWS[:3])
+    asyncio.run(CatalogImporter(str(manifest)).run())
+    unchanged_at = test_db.videos.find_one({"import_key": "iso-1"})["updated_at"]
+
+    # iso-2 moves to a new album; everything else is the same
+    moved = dict(ROWS[2], album="iso-extra")
+    write_jsonl(manifest, [ROWS[0], {"type": "album", "key": "iso-extra", "title": "Extra"}, ROWS[1], moved])
+    report = asyncio.run(CatalogImporter(str(manifest)).run())
+
+    assert report["inserted"] == 1
+    assert report["updated"] == 1
+    assert test_db.videos.find_one({"import_key": "iso-1"})["updated_at"] == unchanged_at
+    assert test_db.albums.find_one({"import_key": "iso"})["video_count"] == 1
+    assert test_db.albums.find_one({"import_key": "iso-extra"})["video_count"] == 1
@@ -0,0 +1,76 @@
+import socket
+import asyncio
+import pytest
+from app.utils.email import SMTPSender, approval_message
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.peers = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        self.peers.add(session.peer)
+        return "250 OK"
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+def test_sender_reuses_one_connection(smtp_server):
+    handler, port = smtp_server
+    sender = SMTPSender(host="127.0.0.1", port=port, username=None, use_tls=False)
+    for i in range(3):
+        sender.send(approval_message(f"user{i}@example.com"))
+    sender.close()
+
+    assert [m.rcpt_tos for m in handler.messages] == [[f"user{i}@example.com"] for i in range(3)]
+    assert len(handler.peers) == 1
+    assert sender.connections == 1
+
+def test_worker_delivers_and_retries(smtp_server, test_db):
+    from app.repositories.email_outbox import email_outbox_repo
+    from app.services.email_outbox import EmailOutboxWorker
+
+    handler, port = smtp_server
+    worker = EmailOutboxWorker(SMTPSender(host="127.0.0.1", port=port, username=None, use_tls=False))
+
+    async def run():
+        await email_outbox_repo.enqueue([approval_message("a@example.com"), approval_message("b@example.com")])
+        sent = await worker.process_batch()
+        worker.sender.port = 1  # nothing listens here
+        await email_outbox_repo.enqueue([approval_message("c@example.com")])
+        await worker.process_batch()
+        await worker.stop()
+        return sent
+
+    assert asyncio.run(run()) == 2
+    assert len(handler.messages) == 2
+    assert test_db.email_outbox.count_documents({"status": "sent"}) == 2
+    failed = test_db.email_outbox.find_one({"to": "c@example.com"})
+    assert failed["status"] == "pending"
+    assert failed["attempts"] == 1
+    assert failed["next_attempt_at"] > failed["created_at"]
+
+def test_expired_claims_are_requeued(test_db):
+    from datetime import datetime, timedelta
+    from app.services.email_outbox import EmailOutboxWorker
+
+    now = datetime.utcnow()
+    test_db.email_outbox.insert_many([
+        {"to": "hung@example.com", "status": "sending", "worker": "other", "locked_at": now - timedelta(hours=1)},
+        {"to": "busy@example.com", "status": "sending", "worker": "other", "locked_at": now}
+    ])
+
+    assert asyncio.run(EmailOutboxWorker().reclaim_stale()) == 1
+    assert test_db.email_outbox.find_one({"to": "hung@example.com"})["status"] == "pending"
+    assert test_db.email_outbox.find_one({"to": "busy@example.com"})["status"] == "sending"
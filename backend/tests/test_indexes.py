@@ -0,0 +1,42 @@
+import pytest
+from app.utils.indexes import ensure_indexes, check_query_plans, full_range_scans
+
+def test_hot_queries_use_indexes(test_db):
+    ensure_indexes(test_db)
+    assert check_query_plans(test_db) == []
+
+def test_ensure_indexes_is_idempotent(test_db):
+    ensure_indexes(test_db)
+    ensure_indexes(test_db)
+    index_names = test_db.users.index_information().keys()
+    assert "email_unique" in index_names
+
+def test_collscan_is_reported(test_db):
+    test_db.videos.insert_one({"title": "Unindexed"})
+    failures = check_query_plans(test_db, [
+        {"name": "by title", "collection": "videos", "filter": {"title": "Unindexed"}}
+    ])
+    assert failures == ["by title"]
+
+def test_full_range_index_scan_is_reported():
+    plan = {
+        "stage": "LIMIT",
+        "inputStage": {
+            "stage": "FETCH",
+            "filter": {"is_admin": {"$eq": True}},
+            "inputStage": {
+                "stage": "IXSCAN",
+                "indexName": "approval_email",
+                "keyPattern": {"is_approved": 1, "is_admin": 1, "email": 1},
+                "indexBounds": {
+                    "is_approved": ["[MinKey, MaxKey]"],
+                    "is_admin": ["[true, true]"],
+                    "email": ["[MinKey, MaxKey]"]
+                }
+            }
+        }
+    }
+    assert full_range_scans(plan) == ["approval_email"]
+
+    plan["inputStage"]["inputStage"]["indexBounds"]["is_approved"] = ["[true, true]"]
+    assert full_range_scans(plan) == []
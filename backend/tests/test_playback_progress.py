@@ -0,0 +1,34 @@
+import asyncio
+from app.services.playback_progress import ProgressBuffer, progress_buffer
+
+def test_buffer_keeps_latest_position_per_user_and_video():
+    buffer = ProgressBuffer()
+    buffer.record("u1", "v1", "a1", 10, 100)
+    buffer.record("u1", "v1", "a1", 20, 100)
+    buffer.record("u1", "v2", "a1", 99, 100)
+    buffer.record("u2", "v1", "a1", 5, 100)
+
+    assert len(buffer) == 3
+    pending = buffer.pending_for_album("u1", "a1")
+    assert pending["v1"]["position"] == 20
+    assert not pending["v1"]["completed"]
+    assert pending["v2"]["completed"]
+    assert buffer.pending_for_album("u1", "other") == {}
+
+def test_progress_is_flushed_and_read_back_per_album(client, test_db, test_video, approved_headers):
+    url = f"/api/videos/videos/{test_video['id']}/progress"
+
+    assert client.post(url, json={"position": 30, "duration": 600}, headers=approved_headers).status_code == 202
+    assert client.post(url, json={"position": 42.5, "duration": 600}, headers=approved_headers).status_code == 202
+    assert client.post("/api/videos/videos/missing/progress", json={"position": 1}, headers=approved_headers).status_code == 404
+
+    # Served from the buffer before the flush, from Mongo after it
+    progress_url = f"/api/videos/albums/{test_video['album_id']}/progress"
+    assert client.get(progress_url, headers=approved_headers).json()[test_video["id"]]["position"] == 42.5
+    asyncio.get_event_loop().run_until_complete(progress_buffer.flush())
+    assert len(progress_buffer) == 0
+    assert test_db.playback_progress.count_documents({}) == 1
+
+    body = client.get(progress_url, headers=approved_headers).json()
+    assert body[test_video["id"]]["position"] == 42.5
+    assert body[test_video["id"]]["completed"] is False
@@ -0,0 +1,73 @@
+import asyncio
+from app.services.title_index import TitleIndex, ALBUM, VIDEO
+
+def test_suggest_matches_any_word_of_a_title():
+    index = TitleIndex()
+    index.add(VIDEO, "v1", "Bhagavad Gita chapter 2")
+    index.add(VIDEO, "v2", "Morning class")
+    index.add(ALBUM, "a1", "Gita lectures")
+
+    assert [s["id"] for s in index.suggest("gi")] == ["v1", "a1"]
+    assert [s["id"] for s in index.suggest("GITA  Ch")] == ["v1"]
+    assert index.suggest("class")[0] == {"type": VIDEO, "id": "v2", "title": "Morning class"}
+    assert index.suggest("kirtan") == []
+    assert index.suggest("  ") == []
+
+def test_suggest_returns_each_title_once_up_to_limit():
+    index = TitleIndex()
+    index.add(VIDEO, "v1", "Gita gita gita")
+    index.add(VIDEO, "v2", "Gita again")
+    assert len(index.suggest("gita")) == 2
+    assert len(index.suggest("gita", limit=1)) == 1
+
+def test_add_replaces_and_remove_forgets_a_title():
+    index = TitleIndex()
+    index.add(VIDEO, "v1", "Old title")
+    index.add(VIDEO, "v1", "New title")
+    assert index.suggest("old") == []
+    assert [s["title"] for s in index.suggest("title")] == ["New title"]
+
+    index.remove(VIDEO, "v1")
+    assert index.suggest("new") == []
+    assert len(index) == 0
+
+def test_replace_all_swaps_the_whole_index():
+    index = TitleIndex()
+    index.add(VIDEO, "v1", "Stale")
+    index.replace_all([(ALBUM, "a1", "Fresh album"), (VIDEO, "v2", None)])
+    assert index.suggest("stale") == []
+    assert [s["id"] for s in index.suggest("fresh")] == ["a1"]
+    assert len(index) == 2
+
+def test_videos_of_unindexed_albums_are_left_out():
+    index = TitleIndex()
+    index.add(ALBUM, "a1", "Active album")
+    index.add_videos([
+        {"id": "v1", "title": "Listed talk", "album_id": "a1"},
+        {"id": "v2", "title": "Hidden talk", "album_id": "inactive"},
+        {"id": "v3", "title": "Loose talk", "album_id": None}
+    ])
+    assert sorted(s["id"] for s in index.suggest("talk")) == ["v1", "v3"]
+
+def test_load_skips_videos_of_inactive_albums(test_db):
+    test_db.albums.insert_one({"id": "old", "title": "Retired album", "is_active": False})
+    test_db.videos.insert_one({"id": "v1", "title": "Retired talk", "album_id": "old"})
+    index = TitleIndex()
+
+    asyncio.get_event_loop().run_until_complete(index.load())
+    assert index.suggest("retired") == []
+
+def test_load_keeps_titles_added_during_the_rebuild(test_db, test_video):
+    index = TitleIndex()
+
+    async def rebuild():
+        loading = asyncio.ensure_future(index.load())
+        # load is now waiting on Mongo, before its snapshot is swapped in
+        await asyncio.sleep(0)
+        index.add(VIDEO, "late", "Added meanwhile")
+        index.remove(VIDEO, test_video["id"])
+        await loading
+
+    asyncio.get_event_loop().run_until_complete(rebuild())
+    assert [s["id"] for s in index.suggest("added")] == ["late"]
+    assert index.suggest("test video") == []
@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.services.upload_jobs import UploadJobManager
+from app.repositories.upload_jobs import upload_jobs_repo
+
+class FakeBunny:
+    def __init__(self, block=False):
+        self.uploads = 0
+        self.block = block
+
+    async def upload_video(self, file, title, on_progress=None):
+        self.uploads += 1
+        if self.block:
+            await asyncio.sleep(3600)
+        return {"video_id": "guid-1", "url": "https://stream/play", "thumbnail": "https://stream/thumb.jpg",
+                "bytes": 4, "seconds": 0.1, "bytes_per_second": 40}
+
+def queued_job(test_db, tmp_path, **fields):
+    staged = tmp_path / "staged"
+    staged.write_bytes(b"data")
+    job = dict({
+        "status": "uploading", "title": "Upload", "created_by": "admin", "staged_path": str(staged),
+        "size": 4, "attempts": 1, "host": "gone-host", "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }, **fields)
+    job["_id"] = test_db.upload_jobs.insert_one(job).inserted_id
+    return job
+
+def test_retry_skips_steps_already_done(test_db, tmp_path):
+    # Uploaded to Bunny and inserted, then the final status write failed
+    job = queued_job(test_db, tmp_path, bunny={
+        "video_id": "guid-1", "url": "https://stream/play", "thumbnail": "https://stream/thumb.jpg",
+        "bytes_per_second": 40
+    })
+    test_db.videos.insert_one({"id": str(job["_id"]), "title": "Upload", "video_id": "guid-1"})
+    bunny = FakeBunny()
+
+    asyncio.run(UploadJobManager(bunny)._process(job))
+
+    assert bunny.uploads == 0
+    assert test_db.videos.count_documents({"video_id": "guid-1"}) == 1
+    saved = test_db.upload_jobs.find_one({"_id": job["_id"]})
+    assert saved["status"] == "completed"
+    # The video's public id, as used by GET /api/videos/{video_id}
+    assert saved["video_id"] == str(job["_id"])
+
+def test_cancelled_upload_is_requeued(test_db, tmp_path):
+    job = queued_job(test_db, tmp_path)
+
+    async def cancel_midway():
+        task = asyncio.ensure_future(UploadJobManager(FakeBunny(block=True))._process(job))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_midway())
+
+    saved = test_db.upload_jobs.find_one({"_id": job["_id"]})
+    assert saved["status"] == "queued"
+    assert saved["attempts"] == 0
+
+def test_sweep_requeues_stale_jobs_of_any_host(test_db, tmp_path):
+    job = queued_job(test_db, tmp_path, updated_at=datetime.utcnow() - timedelta(hours=2))
+
+    asyncio.run(UploadJobManager(FakeBunny()).sweep())
+
+    assert test_db.upload_jobs.find_one({"_id": job["_id"]})["status"] == "queued"
+
+def test_sweep_fails_stale_jobs_out_of_attempts(test_db, tmp_path):
+    job = queued_job(test_db, tmp_path, attempts=3, updated_at=datetime.utcnow() - timedelta(hours=2))
+
+    asyncio.run(UploadJobManager(FakeBunny()).sweep())
+
+    assert test_db.upload_jobs.find_one({"_id": job["_id"]})["status"] == "failed"
+
+def test_failed_attempt_waits_before_it_is_claimed_again(test_db, tmp_path):
+    job = queued_job(test_db, tmp_path, host="this-host")
+
+    class FailingBunny(FakeBunny):
+        async def upload_video(self, file, title, on_progress=None):
+            raise RuntimeError("Bunny is down")
+
+    manager = UploadJobManager(FailingBunny())
+    asyncio.run(manager._process(job))
+
+    saved = test_db.upload_jobs.find_one({"_id": job["_id"]})
+    assert saved["status"] == "queued"
+    assert saved["retry_after"] > datetime.utcnow()
+    assert asyncio.run(upload_jobs_repo.claim_next("this-host", "worker")) is None
@@ -2,6 +2,10 @@ from fastapi.testclient import TestClient
 import pytest
 from bson import ObjectId
 from datetime import datetime
+import asyncio
+from app.repositories.videos import VideoRepository, videos_repo
+from app.utils.cache import TTLCache
+from app.utils.indexes import ensure_indexes
 
 def test_create_video_admin(client, admin_token, test_album):
     response = client.post(
@@ -176,4 +180,140 @@ def test_get_album_videos_unauthorized(client, user_token, test_album):
         f"/api/videos/albums/{test_album['id']}/videos",
         headers={"Authorization": f"Bearer {user_token}"}
     )
-    assert response.status_code == 403 
\ No newline at end of file
+    assert response.status_code == 403 
+
+def test_get_album_videos_paginated(client, approved_user_token, test_db, test_album):
+    videos = [
+        {
+            "id": str(ObjectId()),
+            "title": f"Paged Video {i}",
+            "url": f"https://www.youtube.com/watch?v=paged{i}",
+            "album_id": test_album["id"],
+            "created_by": str(ObjectId()),
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+        for i in range(3)
+    ]
+    test_db.videos.insert_many(videos)
+
+    first = client.get(
+        f"/api/videos/albums/{test_album['id']}/videos?limit=2",
+        headers={"Authorization": f"Bearer {approved_user_token}"}
+    )
+    assert first.status_code == 200
+    assert [v["title"] for v in first.json()] == ["Paged Video 0", "Paged Video 1"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(
+        f"/api/videos/albums/{test_album['id']}/videos?limit=2&after={cursor}",
+        headers={"Authorization": f"Bearer {approved_user_token}"}
+    )
+    assert second.status_code == 200
+    assert [v["title"] for v in second.json()] == ["Paged Video 2"]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_get_album_videos_invalid_cursor(client, approved_user_token, test_album):
+    response = client.get(
+        f"/api/videos/albums/{test_album['id']}/videos?after=not-a-cursor",
+        headers={"Authorization": f"Bearer {approved_user_token}"}
+    )
+    assert response.status_code == 400
+
+def test_get_album_videos_conditional(client, test_db, test_album, approved_headers):
+    url = f"/api/videos/albums/{test_album['id']}/videos"
+    first = client.get(url, headers=approved_headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"].startswith("private")
+
+    cached = client.get(url, headers=dict(approved_headers, **{"If-None-Match": etag}))
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    asyncio.run(videos_repo.insert({
+        "id": str(ObjectId()),
+        "title": "New Video",
+        "url": "https://www.youtube.com/watch?v=new",
+        "album_id": test_album["id"],
+        "created_by": str(ObjectId())
+    }))
+    changed = client.get(url, headers=dict(approved_headers, **{"If-None-Match": etag}))
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [v["title"] for v in changed.json()] == ["New Video"]
+
+def test_share_token_cache_and_rotation(test_db, test_video):
+    async def run():
+        found = await videos_repo.find_by_share_token("test-token")
+        found["_id"] = "mutated by a handler"
+        cached = await videos_repo.find_by_share_token("test-token")
+
+        assert await videos_repo.find_by_share_token("guessed") is None
+        test_db.videos.insert_one(dict(test_video, _id=ObjectId(), id=str(ObjectId()), share_token="guessed"))
+        still_unknown = await videos_repo.find_by_share_token("guessed")
+
+        await videos_repo.set_share_token(test_video["id"], "rotated")
+        old = await videos_repo.find_by_share_token("test-token")
+        new = await videos_repo.find_by_share_token("rotated")
+        return cached, still_unknown, old, new
+
+    cached, still_unknown, old, new = asyncio.run(run())
+    assert isinstance(cached["_id"], ObjectId)
+    assert still_unknown is None
+    assert old is None
+    assert new["id"] == test_video["id"]
+
+def test_share_token_misses_do_not_evict_hits(test_db, test_video):
+    repo = VideoRepository()
+    repo._share_misses = TTLCache(maxsize=2, ttl=60)
+
+    async def run():
+        await repo.find_by_share_token("test-token")
+        for i in range(10):
+            await repo.find_by_share_token(f"guess-{i}")
+
+    asyncio.run(run())
+    assert "test-token" in repo._share_cache
+    assert len(repo._share_misses) == 2
+
+def test_create_videos_bulk(client, test_db, test_album, admin_headers):
+    response = client.post(
+        "/api/videos/videos/bulk",
+        headers=admin_headers,
+        json={"videos": [
+            {"title": "Part 1", "url": "https://www.youtube.com/watch?v=p1", "album_id": test_album["id"]},
+            {"title": "Bad URL", "url": "https://example.com/video"},
+            {"title": "Part 2", "url": "https://www.youtube.com/watch?v=p2", "album_id": test_album["id"]},
+            {"title": "Lost", "url": "https://www.youtube.com/watch?v=p3", "album_id": "missing"}
+        ]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert [r["status"] for r in data["results"]] == ["created", "invalid", "created", "album_not_found"]
+    assert test_db.videos.count_documents({"album_id": test_album["id"]}) == 2
+    assert test_db.albums.find_one({"id": test_album["id"]})["video_count"] == test_album["video_count"] + 2
+
+def test_search_videos_ranks_title_matches_first(client, test_db, test_album, approved_headers):
+    ensure_indexes(test_db)
+    test_db.videos.insert_many([
+        {"id": str(ObjectId()), "title": "Morning class", "description": "On the Bhagavad Gita",
+         "album_id": test_album["id"], "share_token": "s1"},
+        {"id": str(ObjectId()), "title": "Bhagavad Gita chapter 2", "description": "Lecture",
+         "album_id": test_album["id"], "share_token": "s2"},
+        {"id": str(ObjectId()), "title": "Unrelated", "description": "Kirtan",
+         "album_id": test_album["id"], "share_token": "s3"}
+    ])
+
+    response = client.get("/api/videos/videos/search?q=gita&limit=1", headers=approved_headers)
+    assert response.status_code == 200
+    assert [v["title"] for v in response.json()] == ["Bhagavad Gita chapter 2"]
+    assert "url" not in response.json()[0]
+
+    second = client.get(
+        f"/api/videos/videos/search?q=gita&limit=1&after={response.headers['X-Next-Cursor']}",
+        headers=approved_headers
+    )
+    assert [v["title"] for v in second.json()] == ["Morning class"]
+    assert "X-Next-Cursor" not in second.headers
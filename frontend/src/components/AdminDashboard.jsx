@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { toast } from 'react-toastify';
+import { fetchAllPages } from '../utils/api';
 import '../styles/AdminDashboard.css';
 
 const UserManagement = ({ 
@@ -11,16 +12,37 @@ const UserManagement = ({
   handleApproveUser, 
   handleToggleAdmin, 
   currentUser,
-  sortUsersByDate 
+  userCounts = {},
+  userCursors = {},
+  handleLoadMore,
+  userSearch,
+  setUserSearch,
+  handleSearchUsers
 }) => {
+  const loadMoreButton = (bucket) => userCursors[bucket] && (
+    <button className="load-more-button" onClick={() => handleLoadMore(bucket)}>
+      Load more
+    </button>
+  );
+
   return (
     <div className="user-management">
+      <form className="user-search" onSubmit={handleSearchUsers}>
+        <input
+          type="search"
+          placeholder="Search users by email"
+          value={userSearch}
+          onChange={(e) => setUserSearch(e.target.value)}
+        />
+        <button type="submit">Search</button>
+      </form>
+
       <section className="admin-users-section">
-        <h3>Admin Users ({adminUsers.length})</h3>
+        <h3>Admin Users ({userCounts.admins ?? adminUsers.length})</h3>
         <div className="user-list">
           {loading ? (
             <p className="loading">Loading admin users...</p>
-          ) : sortUsersByDate(adminUsers).map(user => {
+          ) : adminUsers.map(user => {
             const isCurrentUser = currentUser && user.email === currentUser.email;
             return (
               <div key={user.id} className="user-card admin">
@@ -50,14 +72,15 @@ const UserManagement = ({
             <p className="no-data">No admin users</p>
           )}
         </div>
+        {loadMoreButton('admins')}
       </section>
 
       <section className="pending-users-section">
-        <h3>Pending Users ({pendingUsers.length})</h3>
+        <h3>Pending Users ({userCounts.pending ?? pendingUsers.length})</h3>
         <div className="user-list">
           {loading ? (
             <p className="loading">Loading pending users...</p>
-          ) : sortUsersByDate(pendingUsers).map(user => (
+          ) : pendingUsers.map(user => (
             <div key={user.id} className="user-card">
               <div className="user-info">
                 <p><strong>Email:</strong> {user.email}</p>
@@ -76,14 +99,15 @@ const UserManagement = ({
             <p className="no-data">No pending users</p>
           )}
         </div>
+        {loadMoreButton('pending')}
       </section>
 
       <section className="approved-users-section">
-        <h3>Regular Users ({approvedUsers.length})</h3>
+        <h3>Regular Users ({userCounts.approved ?? approvedUsers.length})</h3>
         <div className="user-list">
           {loading ? (
             <p className="loading">Loading approved users...</p>
-          ) : sortUsersByDate(approvedUsers).map(user => (
+          ) : approvedUsers.map(user => (
             <div key={user.id} className="user-card">
               <div className="user-info">
                 <p><strong>Email:</strong> {user.email}</p>
@@ -105,6 +129,7 @@ const UserManagement = ({
             <p className="no-data">No approved users</p>
           )}
         </div>
+        {loadMoreButton('approved')}
       </section>
     </div>
   );
@@ -189,6 +214,9 @@ const AdminDashboard = () => {
   const [pendingUsers, setPendingUsers] = useState([]);
   const [approvedUsers, setApprovedUsers] = useState([]);
   const [adminUsers, setAdminUsers] = useState([]);
+  const [userCounts, setUserCounts] = useState({});
+  const [userCursors, setUserCursors] = useState({});
+  const [userSearch, setUserSearch] = useState('');
   const [albums, setAlbums] = useState([]);
   const [newAlbum, setNewAlbum] = useState({ title: '', description: '' });
   const [newVideo, setNewVideo] = useState({
@@ -222,15 +250,25 @@ const AdminDashboard = () => {
   const fetchUsers = async () => {
     try {
       setLoading(true);
-      const [pendingResponse, approvedResponse, adminResponse] = await Promise.all([
-        api.get('/api/admin/users/pending'),
-        api.get('/api/admin/users/approved'),
-        api.get('/api/admin/users/admins')
-      ]);
+      // First page of every bucket in one request; further pages and
+      // search results are fetched when asked for
+      const response = await api.get('/api/admin/users/overview');
+      const { pending, approved, admins } = response.data;
       
-      setPendingUsers(pendingResponse.data);
-      setApprovedUsers(approvedResponse.data);
-      setAdminUsers(adminResponse.data);
+      setPendingUsers(pending.users);
+      setApprovedUsers(approved.users);
+      setAdminUsers(admins.users);
+      setUserCounts({
+        pending: pending.count,
+        approved: approved.count,
+        admins: admins.count
+      });
+      setUserCursors({
+        pending: pending.next_cursor,
+        approved: approved.next_cursor,
+        admins: admins.next_cursor
+      });
+      setUserSearch('');
       
     } catch (error) {
       toast.error('Failed to fetch users');
@@ -239,11 +277,56 @@ const AdminDashboard = () => {
     }
   };
 
+  const fetchUserPage = async (bucket, q, after) => {
+    const response = await api.get('/api/admin/users', {
+      params: { bucket, q: q || undefined, after: after || undefined }
+    });
+    return { users: response.data, cursor: response.headers?.['x-next-cursor'] };
+  };
+
+  const handleSearchUsers = async (e) => {
+    e.preventDefault();
+    if (!userSearch.trim()) {
+      fetchUsers();
+      return;
+    }
+    try {
+      const [pending, approved, admins] = await Promise.all(
+        ['pending', 'approved', 'admins'].map(bucket => fetchUserPage(bucket, userSearch.trim()))
+      );
+      setPendingUsers(pending.users);
+      setApprovedUsers(approved.users);
+      setAdminUsers(admins.users);
+      setUserCursors({
+        pending: pending.cursor,
+        approved: approved.cursor,
+        admins: admins.cursor
+      });
+    } catch (error) {
+      toast.error('Failed to search users');
+    }
+  };
+
+  const handleLoadMore = async (bucket) => {
+    const setters = {
+      pending: setPendingUsers,
+      approved: setApprovedUsers,
+      admins: setAdminUsers
+    };
+    try {
+      const page = await fetchUserPage(bucket, userSearch.trim(), userCursors[bucket]);
+      setters[bucket](users => [...users, ...page.users]);
+      setUserCursors(cursors => ({ ...cursors, [bucket]: page.cursor }));
+    } catch (error) {
+      toast.error('Failed to load more users');
+    }
+  };
+
   const fetchAlbums = async () => {
     try {
-      const response = await api.get('/api/videos/albums');
-      console.log('Albums loaded:', response.data);
-      setAlbums(response.data);
+      const albums = await fetchAllPages(api, '/api/videos/albums');
+      console.log('Albums loaded:', albums);
+      setAlbums(albums);
     } catch (error) {
       toast.error('Failed to fetch albums');
     }
@@ -306,12 +389,6 @@ const AdminDashboard = () => {
     }
   };
 
-  const sortUsersByDate = (users) => {
-    return [...users].sort((a, b) => {
-      return new Date(b.created_at) - new Date(a.created_at);
-    });
-  };
-
   if (loading) {
     return <div className="loading">Loading...</div>;
   }
@@ -345,7 +422,12 @@ const AdminDashboard = () => {
             handleApproveUser={handleApproveUser}
             handleToggleAdmin={handleToggleAdmin}
             currentUser={currentUser}
-            sortUsersByDate={sortUsersByDate}
+            userCounts={userCounts}
+            userCursors={userCursors}
+            handleLoadMore={handleLoadMore}
+            userSearch={userSearch}
+            setUserSearch={setUserSearch}
+            handleSearchUsers={handleSearchUsers}
           />
         ) : (
           <ContentManagement 
@@ -1,9 +1,18 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { toast } from 'react-toastify';
 import VideoPlayer from './VideoPlayer';
+import { fetchAllPages } from '../utils/api';
 import '../styles/VideoBrowser.css';
 
+// The server buffers heartbeats; one every few seconds is plenty to resume from
+const PROGRESS_INTERVAL_MS = 10000;
+
+const formatPosition = (seconds) => {
+  const minutes = Math.floor(seconds / 60);
+  return `${minutes}:${String(Math.floor(seconds % 60)).padStart(2, '0')}`;
+};
+
 const VideoBrowser = () => {
   const { api, user } = useAuth();
   const [albums, setAlbums] = useState([]);
@@ -13,6 +22,10 @@ const VideoBrowser = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [shareUrl, setShareUrl] = useState('');
+  const [progress, setProgress] = useState({});
+  // Fixed when a video is opened, so saving progress does not reload the player
+  const [startAt, setStartAt] = useState(0);
+  const lastHeartbeat = useRef(0);
 
   useEffect(() => {
     fetchAlbums();
@@ -22,8 +35,7 @@ const VideoBrowser = () => {
     try {
       setLoading(true);
       setError(null);
-      const response = await api.get('/api/videos/albums');
-      setAlbums(response.data);
+      setAlbums(await fetchAllPages(api, '/api/videos/albums'));
     } catch (error) {
       console.error('Failed to fetch albums:', error);
       setError('Failed to fetch albums. Please try again later.');
@@ -35,19 +47,50 @@ const VideoBrowser = () => {
 
   const fetchVideos = async (albumId) => {
     try {
-      const response = await api.get(`/api/videos/albums/${albumId}/videos`);
-      setVideos(response.data);
+      setVideos(await fetchAllPages(api, `/api/videos/albums/${albumId}/videos`));
     } catch (error) {
       toast.error('Failed to fetch videos');
     }
   };
 
+  const fetchProgress = async (albumId) => {
+    try {
+      const response = await api.get(`/api/videos/albums/${albumId}/progress`);
+      setProgress(response.data || {});
+    } catch (error) {
+      // Resume positions are a convenience; browsing works without them
+      setProgress({});
+    }
+  };
+
   const handleAlbumClick = (album) => {
     setSelectedAlbum(album);
     fetchVideos(album.id);
+    fetchProgress(album.id);
     setSelectedVideo(null);
   };
 
+  const handleProgress = useCallback((seconds, duration) => {
+    const now = Date.now();
+    if (!selectedVideo || now - lastHeartbeat.current < PROGRESS_INTERVAL_MS) return;
+    lastHeartbeat.current = now;
+    const position = { position: seconds, duration: duration || null };
+    setProgress(current => ({ ...current, [selectedVideo.id]: position }));
+    api.post(`/api/videos/videos/${selectedVideo.id}/progress`, position)
+      .catch(error => console.error('Failed to save progress:', error));
+  }, [api, selectedVideo]);
+
+  const resumeAt = (video) => {
+    const saved = progress[video.id];
+    return saved && !saved.completed ? saved.position : 0;
+  };
+
+  const handleVideoClick = (video) => {
+    setStartAt(resumeAt(video));
+    lastHeartbeat.current = 0;
+    setSelectedVideo(video);
+  };
+
   const handleGenerateShareLink = async (videoId) => {
     try {
       console.log('Generating share link for video:', videoId);
@@ -67,9 +110,14 @@ const VideoBrowser = () => {
 
   const VideoCard = ({ video }) => {
     return (
-      <div className="video-card" onClick={() => setSelectedVideo(video)}>
+      <div className="video-card" onClick={() => handleVideoClick(video)}>
         <h4>{video.title}</h4>
         <p className="video-description-preview">{video.description}</p>
+        {progress[video.id]?.completed ? (
+          <span className="video-progress">Watched</span>
+        ) : resumeAt(video) > 0 && (
+          <span className="video-progress">Resume at {formatPosition(resumeAt(video))}</span>
+        )}
       </div>
     );
   };
@@ -118,7 +166,11 @@ const VideoBrowser = () => {
                 </button>
               )}
             </div>
-            <VideoPlayer videoUrl={selectedVideo.url} />
+            <VideoPlayer
+              videoUrl={selectedVideo.url}
+              startAt={startAt}
+              onProgress={handleProgress}
+            />
             <p className="video-description">{selectedVideo.description}</p>
           </div>
         ) : selectedAlbum ? (
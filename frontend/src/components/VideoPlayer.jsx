@@ -1,20 +1,71 @@
-import React from 'react';
+import React, { useEffect, useRef } from 'react';
 import '../styles/VideoPlayer.css';
 
-const VideoPlayer = ({ videoUrl }) => {
+// Bunny's player speaks the player.js postMessage protocol
+const PLAYER_JS_SUBSCRIBE = JSON.stringify({
+  context: 'player.js',
+  version: '0.0.11',
+  method: 'addEventListener',
+  value: 'timeupdate',
+  listener: 'timeupdate'
+});
+
+const withParam = (url, name, value) =>
+  `${url}${url.includes('?') ? '&' : '?'}${name}=${value}`;
+
+// onProgress(seconds, duration) is called as a Bunny video plays; startAt
+// resumes playback at a position in seconds
+const VideoPlayer = ({ videoUrl, startAt = 0, onProgress }) => {
+  const iframeRef = useRef(null);
+  const startSeconds = Math.floor(startAt || 0);
+
+  const subscribe = () => {
+    if (onProgress) {
+      iframeRef.current?.contentWindow?.postMessage(PLAYER_JS_SUBSCRIBE, '*');
+    }
+  };
+
+  useEffect(() => {
+    if (!onProgress) return undefined;
+    const handleMessage = (event) => {
+      if (!iframeRef.current || event.source !== iframeRef.current.contentWindow) return;
+      let data = event.data;
+      if (typeof data === 'string') {
+        try {
+          data = JSON.parse(data);
+        } catch {
+          return;
+        }
+      }
+      if (data?.context !== 'player.js') return;
+      if (data.event === 'ready') {
+        subscribe();
+      } else if (data.event === 'timeupdate' && data.value) {
+        onProgress(data.value.seconds, data.value.duration);
+      }
+    };
+    window.addEventListener('message', handleMessage);
+    return () => window.removeEventListener('message', handleMessage);
+  }, [onProgress]);
+
   // Check if it's a Bunny.net URL
   const isBunnyUrl = videoUrl.includes('bunny.net') || videoUrl.includes('mediadelivery.net');
   
   if (isBunnyUrl) {
     // Handle direct play URL format like:
     // https://iframe.mediadelivery.net/play/387883/5597529b-2438-424c-b7a4-07f842e2a4d6
-    const embedUrl = videoUrl.includes('iframe.mediadelivery.net') 
+    let embedUrl = videoUrl.includes('iframe.mediadelivery.net') 
       ? videoUrl 
       : `https://iframe.mediadelivery.net/play/${videoUrl}`;
+    if (startSeconds > 0) {
+      embedUrl = withParam(embedUrl, 't', startSeconds);
+    }
 
     return (
       <div className="video-player">
         <iframe
+          ref={iframeRef}
+          onLoad={subscribe}
           src={embedUrl}
           style={{ width: '100%', height: '100%' }}
           frameBorder="0"
@@ -31,7 +82,9 @@ const VideoPlayer = ({ videoUrl }) => {
   return (
     <div className="video-player">
       <iframe
-        src={`https://www.youtube.com/embed/${youtubeId}`}
+        src={startSeconds > 0
+          ? `https://www.youtube.com/embed/${youtubeId}?start=${startSeconds}`
+          : `https://www.youtube.com/embed/${youtubeId}`}
         style={{ width: '100%', height: '100%' }}
         frameBorder="0"
         allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture"
@@ -25,4 +25,19 @@ export const makeAuthenticatedRequest = async (url, options = {}) => {
   }
 
   return response
-} 
\ No newline at end of file
+} 
+
+// Fetches every page of a cursor-paginated list endpoint by following the
+// X-Next-Cursor response header, and returns the concatenated items.
+export const fetchAllPages = async (api, url) => {
+  const items = []
+  let cursor = null
+  do {
+    const response = cursor
+      ? await api.get(url, { params: { after: cursor } })
+      : await api.get(url)
+    items.push(...(response.data || []))
+    cursor = response.headers?.['x-next-cursor']
+  } while (cursor)
+  return items
+}